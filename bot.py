@@ -2,6 +2,7 @@ import logging
 import sys
 import traceback
 from pathlib import Path
+from typing import Optional, TYPE_CHECKING
 
 import aiohttp
 import discord
@@ -9,6 +10,21 @@ from discord.ext import commands
 
 from constants import *
 
+if TYPE_CHECKING:
+    from cogs._events.router import EventRouterCog
+    from cogs.commands.settings import SettingsCommand
+    from cogs.modules.auditcache import AuditLogCacheCog
+    from cogs.modules.auditlogs import AuditLogCog
+    from cogs.modules.chatfilter import ChatFilterCog
+    from cogs.modules.deletecorrelator import DeleteCorrelatorCog
+    from cogs.modules.filterengine import FilterEngineCog
+    from cogs.modules.invitefilter import InviteFilterCog
+    from cogs.modules.linkfilter import LinkFilterCog
+    from cogs.modules.logbuffer import LogBufferCog
+    from cogs.modules.modqueue import ModerationQueueCog
+    from cogs.modules.rolechanges import RoleChangeQueueCog
+    from cogs.modules.settingsstore import SettingsStoreCog
+
 log = logging.getLogger(__name__)
 
 # Check environment
@@ -22,15 +38,44 @@ else:
 
 # Bot prefix function
 def get_prefix(bot, msg):
+    """ Runs for every message so the final prefix list for each guild is cached. DMs are cached under None """
+    guild_id = msg.guild.id if msg.guild else None
+    prefixes = bot.prefix_cache.get(guild_id)
+    if prefixes is not None:
+        return prefixes
+
     prefix = bot.default_prefix
 
     if msg.guild:
-        guild_id = msg.guild.id
-        if str(guild_id) in bot.guild_settings:
-            if "prefix" in bot.guild_settings[str(guild_id)]:
-                prefix = bot.guild_settings[str(guild_id)]["prefix"]
+        settings = bot.guild_settings.get(guild_id)
+        if settings and settings.prefix:
+            prefix = settings.prefix
+
+    prefixes = bot.prefix_cache[guild_id] = commands.when_mentioned_or(prefix)(bot, msg)
+    return prefixes
+
 
-    return commands.when_mentioned_or(prefix)(bot, msg)
+class Services:
+    """ Direct references to the cogs used on hot paths, so event handlers don't look them up by name for every event.
+    Each cog binds itself in cog_load and unbinds in cog_unload, so a reload swaps in the new instance. """
+
+    __slots__ = ('settings', 'audit_logs', 'audit_cache', 'filter_engine', 'chat_filter', 'invite_filter', 'link_filter', 'mod_queue', 'log_buffer',
+                 'role_changes', 'delete_correlator', 'settings_store', 'event_router')
+
+    def __init__(self) -> None:
+        self.settings: Optional[SettingsCommand] = None
+        self.audit_logs: Optional[AuditLogCog] = None
+        self.audit_cache: Optional[AuditLogCacheCog] = None
+        self.filter_engine: Optional[FilterEngineCog] = None
+        self.chat_filter: Optional[ChatFilterCog] = None
+        self.invite_filter: Optional[InviteFilterCog] = None
+        self.link_filter: Optional[LinkFilterCog] = None
+        self.mod_queue: Optional[ModerationQueueCog] = None
+        self.log_buffer: Optional[LogBufferCog] = None
+        self.role_changes: Optional[RoleChangeQueueCog] = None
+        self.delete_correlator: Optional[DeleteCorrelatorCog] = None
+        self.settings_store: Optional[SettingsStoreCog] = None
+        self.event_router: Optional[EventRouterCog] = None
 
 
 # Define bot
@@ -44,11 +89,14 @@ bot = commands.Bot(command_prefix=get_prefix, owner_id=452187819738267687,
                    shard_count=1, shard_id=0, status=discord.Status.idle, activity=discord.Activity(type=discord.ActivityType.playing, name=f'Starting up...'),
                    enable_debug_events=False)
 bot.default_prefix = prefix
+bot.services = Services()
+bot.prefix_cache = {}  # guild id to the list of prefixes, cleared when a prefix or the bot user changes
 
 
 # Events
 @bot.event
 async def on_ready():
+    bot.prefix_cache.clear()  # mention prefixes depend on the bot user
     log.info(f'Bot online! Connected to {(len(bot.guilds))} Discord Servers.')
     await bot.change_presence(activity=discord.Activity(type=discord.ActivityType.watching, name=f'{len(bot.guilds)} guilds'))
 
@@ -63,6 +111,11 @@ async def setup_hook():
 
 @bot.event
 async def close():
+    if bot.services.settings_store:
+        try:
+            await bot.services.settings_store.flushNow()  # cogs aren't unloaded on shutdown
+        except Exception as e:
+            log.warning(f'Failed to save settings on shutdown, they will be replayed from the journal: {e}')
     await bot.session.close()
     await super(commands.Bot, bot).close()  # dont eat the super method
 
@@ -31,20 +31,18 @@ class JoinLeaveCog(commands.Cog):
         e = discord.Embed(colour=0x53dda4, title='New Guild')  # green colour
 
         if guild.me.guild_permissions.view_audit_log:
-            async for entry in guild.audit_logs(limit=1, action=discord.AuditLogAction.bot_add):
+            # the bot was added before it could receive the entry from the gateway, so don't wait for it
+            entry = await self.bot.services.audit_cache.findEntry(guild, discord.AuditLogAction.bot_add, self.bot.user.id, wait=0)
+            if entry is not None:
                 inviter = entry.user
-                target = entry.target
-
-                if target.id == self.bot.user.id:
-                    try:
-                        await inviter.send(f'Hey! :wave:\n'
-                                           f'Thanks for inviting me to **{guild.name}**! To get started, check out the **/help** and **/settings** commands!\n'
-                                           f'For a detailed list of commands, features and examples, consider visiting my Top.gg page: '
-                                           f'https://top.gg/bot/950765718209720360 !', suppress_embeds=True)
-                    except discord.Forbidden:
-                        pass
-                    e.description = f"Invited by `{inviter}`!"
-                    break
+                try:
+                    await inviter.send(f'Hey! :wave:\n'
+                                       f'Thanks for inviting me to **{guild.name}**! To get started, check out the **/help** and **/settings** commands!\n'
+                                       f'For a detailed list of commands, features and examples, consider visiting my Top.gg page: '
+                                       f'https://top.gg/bot/950765718209720360 !', suppress_embeds=True)
+                except discord.Forbidden:
+                    pass
+                e.description = f"Invited by `{inviter}`!"
 
         await self.send_guild_stats(e, guild, member_count)
 
@@ -1,4 +1,3 @@
-import asyncio
 import logging
 
 import discord
@@ -16,10 +15,12 @@ class MemberUpdateCog(commands.Cog):
         if role.guild is None:
             return
 
-        settingsCommand = self.bot.get_cog("SettingsCommand")
+        settingsCommand = self.bot.services.settings
 
         if settingsCommand.getRoleUpdateChannel(role.guild):
-            await self.bot.get_cog("AuditLogCog").handleRoleDelete(role)
+            # members still hold the deleted role's id until discord updates them, so the cache knows who had it right now
+            members = role.members
+            await self.bot.services.audit_logs.handleRoleDelete(role, members)
 
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
@@ -29,44 +30,21 @@ class MemberUpdateCog(commands.Cog):
         if not isinstance(after, discord.Member):
             return
 
-        settingsCommand = self.bot.get_cog("SettingsCommand")
+        settingsCommand = self.bot.services.settings
 
-        if before.roles != after.roles and settingsCommand.getRoleUpdateChannel(after.guild):
+        # computed once here so role changes can be grouped and matched against the audit log with set lookups
+        before_role_ids = frozenset(role.id for role in before.roles)
+        after_role_ids = frozenset(role.id for role in after.roles)
 
-            roles_gained = []
-            for role in after.roles:
-                if role not in before.roles:
-                    roles_gained.append(role)
-
-            roles_lost = []
-            for role in before.roles:
-                if role not in after.roles:
-                    roles_lost.append(role)
-
-            # # TEST
-            # __role = after.guild.get_role(878653340865683457)
-            # _role = after.guild.get_role(872828547562082314)
-            # if __role in roles_gained:
-            #     await after.add_roles(_role)
-            # if __role in roles_lost:
-            #     await after.remove_roles(_role)
-
-            await asyncio.sleep(0.2)  # give role delete event time
-            for role in roles_lost:  # if a role is deleted, dont send members losing role individually but in one embed / file
-                if str(role.id) in self.bot.delete_role_cache:
-                    self.bot.delete_role_cache[str(role.id)].append(after.id)
-                    return
-
-            await self.bot.get_cog("AuditLogCog").handleRoleUpdate(before, after, roles_gained, roles_lost)
+        if before_role_ids != after_role_ids and settingsCommand.getRoleUpdateChannel(after.guild):
+            self.bot.services.role_changes.queue(after, after_role_ids - before_role_ids, before_role_ids - after_role_ids)
 
         elif before.nick != after.nick and settingsCommand.getNickUpdateChannel(after.guild):
-            await self.bot.get_cog("AuditLogCog").handleNickUpdate(before, after)
+            await self.bot.services.audit_logs.handleNickUpdate(before, after)
 
         elif before.is_timed_out() != after.is_timed_out() and settingsCommand.getMemberTimeoutChannel(after.guild):
-            await self.bot.get_cog("AuditLogCog").handleTimeout(before, after)
+            await self.bot.services.audit_logs.handleTimeout(before, after)
 
 
 async def setup(bot):
-    if not hasattr(bot, 'delete_role_cache'):
-        bot.delete_role_cache = {}
     await bot.add_cog(MemberUpdateCog(bot))
@@ -7,6 +7,42 @@ from discord.ext import commands
 log = logging.getLogger(__name__)
 
 
+class MessageView:
+    """ Wraps a message for the handlers of a single event. Each form of the message's content is worked out
+    the first time a handler asks for it and then reused, anything else is read from the message itself. """
+
+    __slots__ = ('message', '_clean_content', '_escaped_content', '_lower_content')
+
+    def __init__(self, message: discord.Message):
+        self.message = message
+        self._clean_content = None
+        self._escaped_content = None
+        self._lower_content = None
+
+    def __getattr__(self, name):
+        return getattr(self.message, name)
+
+    @property
+    def clean_content(self) -> str:
+        """ Resolves every mention so this is worth only doing once """
+        if self._clean_content is None:
+            self._clean_content = self.message.clean_content
+        return self._clean_content
+
+    @property
+    def escaped_content(self) -> str:
+        """ The clean content with backticks removed so it can go inside a code block in an embed """
+        if self._escaped_content is None:
+            self._escaped_content = self.clean_content.replace("`", "")
+        return self._escaped_content
+
+    @property
+    def lower_content(self) -> str:
+        if self._lower_content is None:
+            self._lower_content = self.message.content.lower()
+        return self._lower_content
+
+
 class MessageCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -28,19 +64,7 @@ class MessageCog(commands.Cog):
         if message.author.guild_permissions.manage_messages:  # members with this permission bypass all filters / checks
             return
 
-        settingsCommand = self.bot.get_cog("SettingsCommand")
-
-        if settingsCommand.getChatFilter(message.guild):
-            message_deleted = await self.bot.get_cog("ChatFilterCog").handleChat(message)
-            if message_deleted: return
-
-        if settingsCommand.isInviteFilterEnabled(message.guild):
-            message_deleted = await self.bot.get_cog("InviteFilterCog").handleInvite(message)
-            if message_deleted: return
-
-        if settingsCommand.isLinkFilterEnabled(message.guild):
-            message_deleted = await self.bot.get_cog("LinkFilterCog").handleLink(message)
-            if message_deleted: return
+        await self.bot.services.filter_engine.handleMessage(MessageView(message))
 
     @commands.Cog.listener()
     async def on_message_edit(self, before, after):
@@ -56,67 +80,56 @@ class MessageCog(commands.Cog):
         if not isinstance(after.author, discord.Member):
             return
 
-        settingsCommand = self.bot.get_cog("SettingsCommand")
+        settingsCommand = self.bot.services.settings
+        before, after = MessageView(before), MessageView(after)  # shared by every handler below
 
         if settingsCommand.getMsgEditChannel(after.guild):  # do message edit log here
-            await self.bot.get_cog("AuditLogCog").handleEdit(before, after)
+            await self.bot.services.audit_logs.handleEdit(before, after)
 
         if after.author.guild_permissions.manage_messages:  # members with this permission bypass all filters / checks
             return
 
-        if settingsCommand.getChatFilter(after.guild):
-            message_deleted = await self.bot.get_cog("ChatFilterCog").handleChatEdit(before, after)
-            if message_deleted: return
-
-        if settingsCommand.isInviteFilterEnabled(after.guild):
-            message_deleted = await self.bot.get_cog("InviteFilterCog").handleInviteEdit(before, after)
-            if message_deleted: return
-
-        if settingsCommand.isLinkFilterEnabled(after.guild):
-            message_deleted = await self.bot.get_cog("LinkFilterCog").handleLinkEdit(before, after)
-            if message_deleted: return
+        await self.bot.services.filter_engine.handleMessageEdit(before, after)
 
     @commands.Cog.listener()
     async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
         if not payload.guild_id or payload.cached_message:  # Cached messages are handled by the non raw event
             return
 
-        settingsCommand = self.bot.get_cog("SettingsCommand")
+        settingsCommand = self.bot.services.settings
         guild = self.bot.get_guild(payload.guild_id)
         if settingsCommand.getMsgEditChannel(guild):
-            await self.bot.get_cog("AuditLogCog").handleRawEdit(payload, guild)
+            await self.bot.services.audit_logs.handleRawEdit(payload, guild)
 
     @commands.Cog.listener()
     async def on_message_delete(self, message: discord.Message):
         if not message.guild:
             return
 
-        settingsCommand = self.bot.get_cog("SettingsCommand")
+        settingsCommand = self.bot.services.settings
         if settingsCommand.getMsgDeleteChannel(message.guild) or settingsCommand.getModMsgDeleteChannel(message.guild):
-            await self.bot.get_cog("AuditLogCog").handleDelete(message)
+            await self.bot.services.audit_logs.handleDelete(MessageView(message))
 
     @commands.Cog.listener()
     async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
         if not payload.guild_id or payload.cached_message:  # Cached messages are handled by the non raw event
             return
 
-        settingsCommand = self.bot.get_cog("SettingsCommand")
+        settingsCommand = self.bot.services.settings
         guild = self.bot.get_guild(payload.guild_id)
         if settingsCommand.getMsgDeleteChannel(guild) or settingsCommand.getModMsgDeleteChannel(guild):
-            await self.bot.get_cog("AuditLogCog").handleRawDelete(payload, guild)
+            await self.bot.services.audit_logs.handleRawDelete(payload, guild)
 
     @commands.Cog.listener()
     async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
         if not payload.guild_id:
             return
 
-        settingsCommand = self.bot.get_cog("SettingsCommand")
+        settingsCommand = self.bot.services.settings
         guild = self.bot.get_guild(payload.guild_id)
         if settingsCommand.getModMsgDeleteChannel(guild):
-            await self.bot.get_cog("AuditLogCog").handleRawBulkDelete(payload, guild)
+            await self.bot.services.audit_logs.handleRawBulkDelete(payload, guild)
 
 
 async def setup(bot):
-    if not hasattr(bot, 'delete_log_cache'):
-        bot.delete_log_cache = {}
     await bot.add_cog(MessageCog(bot))
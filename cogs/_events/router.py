@@ -0,0 +1,60 @@
+import logging
+
+from discord.ext import commands
+
+from cogs.commands.settings import DEFAULT_SETTINGS, Feature
+
+log = logging.getLogger(__name__)
+
+
+def _guildId(obj):
+    guild = obj.guild
+    return guild.id if guild else None
+
+
+# event name to (how to get the guild id from the first event argument, the features which use that event)
+ROUTES = {
+    "message_edit": (_guildId, int(Feature.MSG_EDIT_LOG | Feature.FILTERS)),
+    "raw_message_edit": (lambda payload: payload.guild_id, int(Feature.MSG_EDIT_LOG)),
+    "message_delete": (_guildId, int(Feature.MSG_DELETE_LOG | Feature.MOD_MSG_DELETE_LOG)),
+    "raw_message_delete": (lambda payload: payload.guild_id, int(Feature.MSG_DELETE_LOG | Feature.MOD_MSG_DELETE_LOG)),
+    "raw_bulk_message_delete": (lambda payload: payload.guild_id, int(Feature.MOD_MSG_DELETE_LOG)),
+    "member_update": (lambda before: before.guild.id, int(Feature.ROLE_LOG | Feature.NICK_LOG | Feature.TIMEOUT_LOG)),
+    "guild_role_delete": (lambda role: role.guild.id, int(Feature.ROLE_LOG)),
+    "audit_log_entry_create": (lambda entry: entry.guild.id,
+                               int(Feature.MSG_DELETE_LOG | Feature.MOD_MSG_DELETE_LOG | Feature.NICK_LOG | Feature.TIMEOUT_LOG | Feature.ROLE_LOG)),
+}
+
+
+class EventRouterCog(commands.Cog):
+    """ Most guilds have no logging or filters set up, so their edit, delete and member update events are dropped here
+    with one bitmask test instead of being scheduled for every listener. Other events are dispatched as normal.
+    The connection state keeps the dispatch method it was created with, so the hook is installed there. """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.dropped = 0  # events skipped since the cog was loaded
+        self._dispatch = bot._connection.dispatch
+        bot._connection.dispatch = self.dispatch
+
+    async def cog_load(self) -> None:
+        self.bot.services.event_router = self
+
+    async def cog_unload(self) -> None:
+        self.bot.services.event_router = None
+        self.bot._connection.dispatch = self._dispatch  # back to the normal dispatch method
+
+    def dispatch(self, event_name: str, /, *args, **kwargs):
+        route = ROUTES.get(event_name)
+        if route is not None and event_name not in self.bot._listeners:  # wait_for calls still get every event
+            getGuildId, features = route
+            guild_id = getGuildId(args[0])
+            if guild_id is not None and not self.bot.guild_settings.get(guild_id, DEFAULT_SETTINGS).features & features:
+                self.dropped += 1
+                return
+
+        self._dispatch(event_name, *args, **kwargs)
+
+
+async def setup(bot):
+    await bot.add_cog(EventRouterCog(bot))
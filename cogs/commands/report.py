@@ -1,12 +1,13 @@
 import logging
 from datetime import datetime, timedelta
-from io import BytesIO
 from typing import Optional, Union, List
 
 import discord
 from discord import app_commands, ui
 from discord.ext import commands
 
+from cogs.modules.logrender import LogRecord, formatTime, formatTimeForFile
+
 log = logging.getLogger(__name__)
 
 
@@ -147,61 +148,45 @@ class ReportCommand(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True, view=view)
 
             # Send to reports channel
-            embed = discord.Embed(colour=discord.Colour(0x2F3136), timestamp=discord.utils.utcnow(),
-                                  description=f'{interaction.user.mention} ({interaction.user}) has reported [this]({self.message.jump_url}) message '
-                                              f'from {self.message.author.mention} ({self.message.author})!')
-            embed.set_author(name="Message Report Received", icon_url=interaction.user.display_avatar.url)
-            embed.set_thumbnail(url=self.message.author.display_avatar.url)
+            record = LogRecord("Message Report Received", icon_url=interaction.user.display_avatar.url, timestamp=discord.utils.utcnow())
+            record.thumbnail_url = self.message.author.display_avatar.url
+            record.add(f'{interaction.user.mention} ({interaction.user}) has reported [this]({self.message.jump_url}) message '
+                       f'from {self.message.author.mention} ({self.message.author})!\n',
+                       f'{interaction.user} has reported a message from {self.message.author}\n')
 
             if self.message.author.joined_at is None:
                 reportedUserServerJoinTime = "`Unknown`"
+                reportedUserServerJoinTimeForFile = "Unknown"
             else:
-                reportedUserServerJoinTime = f'{discord.utils.format_dt(self.message.author.joined_at, "F")} ({discord.utils.format_dt(self.message.author.joined_at, "R")})'
-
-            embed.description +=  f'\n\n**Reported User\'s Info:**\n' \
-                                              f'Discord Tag: `{self.message.author}`\n' \
-                                              f'Discord ID: `{self.message.author.id}`\n' \
-                                              f'Account Created: {discord.utils.format_dt(self.message.author.created_at, "F")} ({discord.utils.format_dt(self.message.author.created_at, "R")})\n' \
-                                              f'Joined Server: {reportedUserServerJoinTime}'
+                reportedUserServerJoinTime = formatTime(self.message.author.joined_at)
+                reportedUserServerJoinTimeForFile = formatTimeForFile(self.message.author.joined_at)
 
-            embed.description += f'\n\n**Reported Message\'s Info:**\n' \
-                                 f'Message ID: `{self.message.id}`\n' \
-                                 f'Channel: {self.message.channel.mention}\n' \
-                                 f'Created: {discord.utils.format_dt(self.message.created_at, "F")} ({discord.utils.format_dt(self.message.created_at, "R")})\n' \
-                                 f'Attachments: `{len(self.message.attachments)}`\n' \
-                                 f'Reactions: `{len(self.message.reactions)}\n`'
+            record.heading("Reported User's Info")
+            record.line('Discord Tag', f'`{self.message.author}`', f'{self.message.author}')
+            record.line('Discord ID', f'`{self.message.author.id}`', f'{self.message.author.id}')
+            record.add(f'Account Created: {formatTime(self.message.author.created_at)}\n',
+                       f'Account Created (UTC): {formatTimeForFile(self.message.author.created_at)}\n')
+            record.add(f'Joined Server: {reportedUserServerJoinTime}\n', f'Joined Server (UTC): {reportedUserServerJoinTimeForFile}\n')
 
             if self.message.content:
                 content = self.message.clean_content.replace("`", "")  # remove so no messed up format
             else:
                 content = "None"
-            embed.description += f'Content: `{content}`'
 
-            embed.description += f"\n\n**Report reason:**\n`{reportReason}`"
+            record.heading("Reported Message's Info")
+            record.line('Message ID', f'`{self.message.id}`', f'{self.message.id}')
+            record.line('Channel', self.message.channel.mention, f'#{self.message.channel}')
+            record.add(f'Created: {formatTime(self.message.created_at)}\n', f'Created (UTC): {formatTimeForFile(self.message.created_at)}\n')
+            record.line('Attachments', f'`{len(self.message.attachments)}`', f'{len(self.message.attachments)}')
+            record.line('Reactions', f'`{len(self.message.reactions)}`', f'{len(self.message.reactions)}')
+            record.line('Content', f'`{content}`', self.message.clean_content)
 
-            for attachment in self.message.attachments:
-                if attachment.content_type.startswith("image"):
-                    embed.set_image(url=attachment.url)
-                    embed.description += f"\n\n**Message Image:**"
-                    break
+            record.heading("Report reason")
+            record.add(f'`{reportReason}`\n', f'{self.reason.value}\n')
+            record.messageImage(self.message)
 
             # Check embed size
-            file = None
-            content = None
-            if len(embed.description) > 4096 or len(embed) > 6000:
-                # attach as a file
-                embed = None
-                content = "**Message Report!**"
-                fileContent = f'{interaction.user} has reported a message from {self.message.author}\n\n' \
-                              f'Message ID: {self.message.id}\n' \
-                              f'Channel: #{self.message.channel}\n' \
-                              f'Created (UTC): {self.message.created_at.strftime("%Y-%m-%d %H:%M-%S")}\n' \
-                              f'Attachments: {len(self.message.attachments)}\n' \
-                              f'Content: {self.message.clean_content}' \
-                              f"\n\nReport reason:\n{self.reason.value}"
-
-                buffer = BytesIO(fileContent.encode('utf-8'))
-                file = discord.File(fp=buffer, filename='message_report.txt')
+            content, embed, file = record.render("**Message Report!**", 'message_report.txt')
 
             if self.settingsCog.getReportsAlertRole(interaction.guild):
                 if content:
@@ -470,42 +455,31 @@ class ReportCommand(commands.Cog):
                                 recent_messages.append(message)
 
 
-                embed_content = ""
-                file_content = ""
                 recent_messages.reverse()
-                for message in recent_messages:
 
-                    embed_content += f"_Message ID {message.id}_\n"
-                    embed_content += f"Channel: {message.channel.mention}\n"
-                    embed_content += f"Created: {discord.utils.format_dt(message.created_at)}\n"
+                record = LogRecord(None, timestamp=discord.utils.utcnow())
+                record.add(f'{len(recent_messages)} recent messages from <@!{user_id}> ({user_tag}) found in {interaction.guild.name}.\n',
+                           f'{len(recent_messages)} recent messages from {user_tag} found in {interaction.guild.name}.\n')
+                if recent_messages:
+                    record.heading("Recent Messages")
+
+                for message in recent_messages:
                     if message.content:
-                        embed_content += f"Content: `{message.clean_content.replace('`', '')}`\n\n"
+                        embed_content = f"`{message.clean_content.replace('`', '')}`"
                     else:
-                        embed_content += f"Content: `None`\n\n"
-
-                    file_content += f"- Message ID {message.id}:\n"
-                    file_content += f"  Channel: #{message.channel.name}\n"
-                    file_content += f"  Created (UTC): {message.created_at.strftime('%Y-%m-%d %H:%M-%S')}\n"  # year-month-day hour:min:sec
-                    file_content += f"  Content: {message.clean_content}\n\n"
-
-                embed = discord.Embed(timestamp=discord.utils.utcnow())
-                embed.colour = discord.Colour(0x2F3136)
-
-                embed.description = f'{len(recent_messages)} recent messages from <@!{user_id}> ({user_tag}) found in {interaction.guild.name}.'
-                if embed_content != "":
-                    embed.description +=    f'\n\n**Recent Messages:**\n' \
-                                            f'{embed_content}'
-
-                if len(embed.description) > 4096 or len(embed) > 6000:
-                    # attach as a file
-                    content = "**Recent Messages!**"
-                    fileContent = f"{len(recent_messages)} recent messages from {user_tag} found in {interaction.guild.name}." \
-                                  f'\n\nRecent Messages:\n' \
-                                  f'{file_content}'
-
-                    buffer = BytesIO(fileContent.encode('utf-8'))
-                    file = discord.File(fp=buffer, filename='recent_messages.txt')
-
+                        embed_content = "`None`"
+
+                    record.add(f"_Message ID {message.id}_\n"
+                               f"Channel: {message.channel.mention}\n"
+                               f"Created: {discord.utils.format_dt(message.created_at)}\n"
+                               f"Content: {embed_content}\n\n",
+                               f"- Message ID {message.id}:\n"
+                               f"  Channel: #{message.channel.name}\n"
+                               f"  Created (UTC): {formatTimeForFile(message.created_at)}\n"
+                               f"  Content: {message.clean_content}\n\n")
+
+                content, embed, file = record.render("**Recent Messages!**", 'recent_messages.txt')
+                if file:
                     await interaction.response.send_message(content=content, file=file, ephemeral=True)
                 else:
                     await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -20,10 +20,127 @@ class SettingPage(enum.Enum):
     Misc = 4
 
 
+class Feature(enum.IntFlag):
+    """ The features a guild has set up. Each guild's settings hold these as a bitmask so events can be skipped with one test """
+    MSG_DELETE_LOG = enum.auto()
+    MOD_MSG_DELETE_LOG = enum.auto()
+    MSG_EDIT_LOG = enum.auto()
+    NICK_LOG = enum.auto()
+    TIMEOUT_LOG = enum.auto()
+    ROLE_LOG = enum.auto()
+    MOD_LOG = enum.auto()
+    CHAT_FILTER = enum.auto()
+    INVITE_FILTER = enum.auto()
+    LINK_FILTER = enum.auto()
+
+    FILTERS = CHAT_FILTER | INVITE_FILTER | LINK_FILTER
+
+
+class GuildSettings:
+    """ An immutable snapshot of a guild's settings with the defaults filled in and some flags worked out up front.
+    Changing a setting makes a new snapshot which replaces the old one in bot.guild_settings in a single assignment. """
+
+    DEFAULTS = {
+        "prefix": None,  # None means the bot's default prefix
+        "reports_channel_id": None,
+        "reports_alert_role_id": None,
+        "reports_banned_role_id": None,
+        "report_self": True,
+        "report_bots": True,
+        "report_admins": True,
+        "invite_filter": False,
+        "link_filter": False,
+        "whitelisted_links": (),
+        "chat_filter": (),
+        "mod_log_channel_id": None,
+        "msg_delete_channel_id": None,
+        "mod_msg_delete_channel_id": None,
+        "msg_edit_channel_id": None,
+        "nick_edit_channel_id": None,
+        "member_timeout_channel_id": None,
+        "role_update_channel_id": None,
+        "log_bot_actions": True,
+        "log_batch_delay": 0,
+    }
+
+    FEATURE_COLUMNS = {
+        "msg_delete_channel_id": Feature.MSG_DELETE_LOG,
+        "mod_msg_delete_channel_id": Feature.MOD_MSG_DELETE_LOG,
+        "msg_edit_channel_id": Feature.MSG_EDIT_LOG,
+        "nick_edit_channel_id": Feature.NICK_LOG,
+        "member_timeout_channel_id": Feature.TIMEOUT_LOG,
+        "role_update_channel_id": Feature.ROLE_LOG,
+        "mod_log_channel_id": Feature.MOD_LOG,
+        "chat_filter": Feature.CHAT_FILTER,
+        "invite_filter": Feature.INVITE_FILTER,
+        "link_filter": Feature.LINK_FILTER,
+    }
+
+    __slots__ = (*DEFAULTS, "features", "any_filter")
+
+    def __init__(self, **settings) -> None:
+        setattr_ = super().__setattr__
+        for column, default in self.DEFAULTS.items():
+            value = settings.get(column)
+            setattr_(column, default if value is None else value)
+
+        # lists are stored as tuples so a snapshot can't be changed through a getter
+        setattr_("whitelisted_links", tuple(self.whitelisted_links))
+        setattr_("chat_filter", tuple(self.chat_filter))
+
+        features = 0
+        for column, feature in self.FEATURE_COLUMNS.items():
+            if getattr(self, column):
+                features |= feature
+        setattr_("features", int(features))  # a plain int is quicker to test than the flag
+
+        setattr_("any_filter", bool(self.invite_filter or self.link_filter or self.chat_filter))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GuildSettings is immutable, use replace() instead")
+
+    @classmethod
+    def fromRecord(cls, record) -> "GuildSettings":
+        """ Builds a snapshot from a row of the guilds table. Rows with only default settings share DEFAULT_SETTINGS """
+        settings = cls(**{column: value for column, value in record.items() if column in cls.DEFAULTS})
+        return DEFAULT_SETTINGS if settings.isDefault() else settings
+
+    def isDefault(self) -> bool:
+        return all(getattr(self, column) == default for column, default in self.DEFAULTS.items())
+
+    def replace(self, **changes) -> "GuildSettings":
+        """ Returns a new snapshot with some settings changed. Setting one to None resets it to the default """
+        settings = {column: getattr(self, column) for column in self.DEFAULTS}
+        settings.update(changes)
+        return GuildSettings(**settings)
+
+
+DEFAULT_SETTINGS = GuildSettings()  # shared by every guild that hasn't changed any settings
+
+
+def _configuredCondition(column: str, default) -> str:
+    """ SQL which is true when a column holds something other than its default. NULL always means the default """
+    if default is None or default == ():
+        return f"{column} IS NOT NULL"
+    sql_default = str(default).upper()  # TRUE, FALSE or a number
+    return f"COALESCE({column}, {sql_default}) <> {sql_default}"
+
+
+GUILD_COLUMNS = ', '.join(("guild_id", "updated_at", *GuildSettings.DEFAULTS))  # only what the settings snapshots use
+# guilds which haven't changed anything aren't loaded, they share DEFAULT_SETTINGS
+CONFIGURED_GUILDS = ' OR '.join(_configuredCondition(column, default) for column, default in GuildSettings.DEFAULTS.items())
+
+
 class SettingsCommand(commands.Cog):
     def __init__(self, bot) -> None:
         self.bot = bot
 
+    async def cog_load(self) -> None:
+        self.bot.services.settings = self
+
+    async def cog_unload(self) -> None:
+        self.bot.services.settings = None
+
     @app_commands.command(name='settings', description='Configure how I work in your server.')
     @app_commands.default_permissions(manage_guild=True)
     @app_commands.guild_only()
@@ -36,17 +153,8 @@ class SettingsCommand(commands.Cog):
             return await interaction.response.send_message("You must have the `Manage Server` permission to use this.", ephemeral=True)
 
         guild = interaction.guild
-        guild_id = guild.id
-
-        if str(guild_id) not in self.bot.guild_settings:
-            # Attempt to add guild to database
-            query = "INSERT INTO guilds(guild_id) VALUES($1) ON CONFLICT(guild_id) DO NOTHING;"
-            async with self.bot.pool.acquire() as conn:
-                async with conn.transaction():
-                    await conn.execute(query, interaction.guild.id)
-                    log.info(f"Guild added to database: {guild_id}")
-                    self.bot.guild_settings[str(guild_id)] = {}
 
+        # guilds without a row use the defaults, and saving a setting adds the row
         embed = self.getEmbed(guild, SettingPage.Reports)
         view = self.SettingsView(bot=self.bot,
                                  author_id=interaction.user.id,
@@ -173,6 +281,9 @@ class SettingsCommand(commands.Cog):
                 await interaction.response.send_modal(model)
             elif button == "Log Bot Actions":
                 await self.cog.toggleLogBotActions(interaction, self)
+            elif button == "Log Batching":
+                model = self.cog.LogBatchingModel(self.bot, self)
+                await interaction.response.send_modal(model)
 
             # misc
             elif button == "Prefix":
@@ -382,6 +493,16 @@ class SettingsCommand(commands.Cog):
                                   f"a bot timing out a member or a bot updating a member's roles. Disable this for less spammy logs.\n"
                                   f"_Value_: {log_bot_actions}", inline=False)
 
+            log_batch_delay = self.getLogBatchDelay(guild)
+            if log_batch_delay:
+                log_batching = f"`Every {log_batch_delay} second{'s' if log_batch_delay != 1 else ''}` <:tick:873224615881748523>"
+            else:
+                log_batching = "`Disabled` <:cross:872834807476924506>"
+            embed.add_field(name='<:logs:966670156925390928> **Log Batching**',
+                            value=f"_Description_: When enabled logs are collected and sent together, up to 10 per message, instead of one message per log. "
+                                  f"Set how many seconds logs can wait before being sent. Useful for busy servers.\n"
+                                  f"_Value_: {log_batching}", inline=False)
+
             return embed
 
         elif type == SettingPage.Misc:
@@ -427,7 +548,8 @@ class SettingsCommand(commands.Cog):
                 discord.ui.Button(custom_id="Role Update", style=discord.ButtonStyle.blurple, emoji="<:role:976126458231660586>", row=2),
 
                 discord.ui.Button(custom_id="Log Bot Actions", style=discord.ButtonStyle.green if self.isLogBotActionsEnabled(guild) else discord.ButtonStyle.red, emoji="<:bot:966666994357248031>",
-                                  row=3)
+                                  row=3),
+                discord.ui.Button(custom_id="Log Batching", style=discord.ButtonStyle.blurple, emoji="<:logs:966670156925390928>", row=3)
             ]
 
         elif type == SettingPage.Misc:
@@ -460,152 +582,129 @@ class SettingsCommand(commands.Cog):
                 break
         return roleFound
 
+    def getSettings(self, guild: discord.Guild) -> GuildSettings:
+        return self.bot.guild_settings.get(guild.id, DEFAULT_SETTINGS)
+
+    def updateSettings(self, guild_id: int, **changes):
+        """ Swaps in a new settings snapshot for a guild and drops anything that was built from the old one """
+        settings = self.bot.guild_settings.get(guild_id, DEFAULT_SETTINGS)
+        self.setSettings(guild_id, settings.replace(**changes))
+
+    def setSettings(self, guild_id: int, settings: GuildSettings):
+        if settings.isDefault():
+            self.bot.guild_settings.pop(guild_id, None)  # only guilds with something changed are kept
+        else:
+            self.bot.guild_settings[guild_id] = settings
+        self.invalidateCaches(guild_id)
+
+    def invalidateCaches(self, guild_id: int):
+        self.bot.prefix_cache.pop(guild_id, None)
+
+        chatFilterCog = self.bot.services.chat_filter
+        if chatFilterCog:
+            chatFilterCog.invalidateMatcher(guild_id)
+
+        linkFilterCog = self.bot.services.link_filter
+        if linkFilterCog:
+            linkFilterCog.invalidateWhitelist(guild_id)
+
+        filterEngineCog = self.bot.services.filter_engine
+        if filterEngineCog:
+            filterEngineCog.invalidatePrescreen(guild_id)
+
+    def clearCaches(self):
+        """ Called when every guild's settings are reloaded """
+        self.bot.prefix_cache.clear()
+
+        chatFilterCog = self.bot.services.chat_filter
+        if chatFilterCog:
+            chatFilterCog.clearMatchers()
+
+        linkFilterCog = self.bot.services.link_filter
+        if linkFilterCog:
+            linkFilterCog.clearWhitelists()
+
+        filterEngineCog = self.bot.services.filter_engine
+        if filterEngineCog:
+            filterEngineCog.clearPrescreens()
+
     def getReportsChannel(self, guild: discord.Guild) -> discord.TextChannel:
-        reportsChannel = None
-        if str(guild.id) in self.bot.guild_settings:
-            if "reports_channel_id" in self.bot.guild_settings[str(guild.id)]:
-                reportsChannel = guild.get_channel(self.bot.guild_settings[str(guild.id)]["reports_channel_id"])
-        return reportsChannel
+        reports_channel_id = self.getSettings(guild).reports_channel_id
+        return guild.get_channel(reports_channel_id) if reports_channel_id else None
 
     def getReportsAlertRole(self, guild: discord.Guild) -> discord.Role:
-        reportsRole = None
-        if str(guild.id) in self.bot.guild_settings:
-            if "reports_alert_role_id" in self.bot.guild_settings[str(guild.id)]:
-                reportsRole = guild.get_role(self.bot.guild_settings[str(guild.id)]["reports_alert_role_id"])
-        return reportsRole
+        reports_alert_role_id = self.getSettings(guild).reports_alert_role_id
+        return guild.get_role(reports_alert_role_id) if reports_alert_role_id else None
 
     def getReportsBannedRole(self, guild: discord.Guild) -> discord.Role:
-        reportsBannedRole = None
-        if str(guild.id) in self.bot.guild_settings:
-            if "reports_banned_role_id" in self.bot.guild_settings[str(guild.id)]:
-                reportsBannedRole = guild.get_role(self.bot.guild_settings[str(guild.id)]["reports_banned_role_id"])
-        return reportsBannedRole
+        reports_banned_role_id = self.getSettings(guild).reports_banned_role_id
+        return guild.get_role(reports_banned_role_id) if reports_banned_role_id else None
 
     def isReportSelfEnabled(self, guild: discord.Guild) -> bool:
-        report_self = True
-        if str(guild.id) in self.bot.guild_settings:
-            if "report_self" in self.bot.guild_settings[str(guild.id)]:
-                report_self = self.bot.guild_settings[str(guild.id)]["report_self"]
-        return report_self
+        return self.getSettings(guild).report_self
 
     def isReportBotsEnabled(self, guild: discord.Guild) -> bool:
-        report_bots = True
-        if str(guild.id) in self.bot.guild_settings:
-            if "report_bots" in self.bot.guild_settings[str(guild.id)]:
-                report_bots = self.bot.guild_settings[str(guild.id)]["report_bots"]
-        return report_bots
+        return self.getSettings(guild).report_bots
 
     def isReportAdminsEnabled(self, guild: discord.Guild) -> bool:
-        report_admins = True
-        if str(guild.id) in self.bot.guild_settings:
-            if "report_admins" in self.bot.guild_settings[str(guild.id)]:
-                report_admins = self.bot.guild_settings[str(guild.id)]["report_admins"]
-        return report_admins
+        return self.getSettings(guild).report_admins
 
     def isInviteFilterEnabled(self, guild: discord.Guild) -> bool:
-        invite_filter = False
-        if str(guild.id) in self.bot.guild_settings:
-            if "invite_filter" in self.bot.guild_settings[str(guild.id)]:
-                invite_filter = self.bot.guild_settings[str(guild.id)]["invite_filter"]
-        return invite_filter
+        return self.getSettings(guild).invite_filter
 
     def isLinkFilterEnabled(self, guild: discord.Guild) -> bool:
-        link_filter = False
-        if str(guild.id) in self.bot.guild_settings:
-            if "link_filter" in self.bot.guild_settings[str(guild.id)]:
-                link_filter = self.bot.guild_settings[str(guild.id)]["link_filter"]
-        return link_filter
+        return self.getSettings(guild).link_filter
 
     def getModLogChannel(self, guild: discord.Guild) -> discord.TextChannel:
-        mod_log_channel = None
-        if str(guild.id) in self.bot.guild_settings:
-            if "mod_log_channel_id" in self.bot.guild_settings[str(guild.id)]:
-                mod_log_channel = guild.get_channel(self.bot.guild_settings[str(guild.id)]["mod_log_channel_id"])
-        return mod_log_channel
-
-    def getWhitelistedLinks(self, guild: discord.Guild) -> list:
-        whitelisted_links = []
-        if str(guild.id) in self.bot.guild_settings:
-            if "whitelisted_links" in self.bot.guild_settings[str(guild.id)]:
-                whitelisted_links = self.bot.guild_settings[str(guild.id)]["whitelisted_links"]
-        return whitelisted_links
-
-    def getChatFilter(self, guild: discord.Guild) -> list:
-        chat_filter = []
-        if str(guild.id) in self.bot.guild_settings:
-            if "chat_filter" in self.bot.guild_settings[str(guild.id)]:
-                chat_filter = self.bot.guild_settings[str(guild.id)]["chat_filter"]
-        return chat_filter
+        mod_log_channel_id = self.getSettings(guild).mod_log_channel_id
+        return guild.get_channel(mod_log_channel_id) if mod_log_channel_id else None
+
+    def getWhitelistedLinks(self, guild: discord.Guild) -> tuple:
+        return self.getSettings(guild).whitelisted_links
+
+    def getChatFilter(self, guild: discord.Guild) -> tuple:
+        return self.getSettings(guild).chat_filter
 
     def getMsgDeleteChannel(self, guild: discord.Guild) -> discord.TextChannel:
-        msg_delete_channel = None
-        if str(guild.id) in self.bot.guild_settings:
-            if "msg_delete_channel_id" in self.bot.guild_settings[str(guild.id)]:
-                msg_delete_channel = guild.get_channel(self.bot.guild_settings[str(guild.id)]["msg_delete_channel_id"])
-        return msg_delete_channel
+        msg_delete_channel_id = self.getSettings(guild).msg_delete_channel_id
+        return guild.get_channel(msg_delete_channel_id) if msg_delete_channel_id else None
 
     def getModMsgDeleteChannel(self, guild: discord.Guild) -> discord.TextChannel:
-        mod_msg_delete_channel = None
-        if str(guild.id) in self.bot.guild_settings:
-            if "mod_msg_delete_channel_id" in self.bot.guild_settings[str(guild.id)]:
-                mod_msg_delete_channel = guild.get_channel(self.bot.guild_settings[str(guild.id)]["mod_msg_delete_channel_id"])
-        return mod_msg_delete_channel
+        mod_msg_delete_channel_id = self.getSettings(guild).mod_msg_delete_channel_id
+        return guild.get_channel(mod_msg_delete_channel_id) if mod_msg_delete_channel_id else None
 
     def getMsgEditChannel(self, guild: discord.Guild) -> discord.TextChannel:
-        msg_edit_channel = None
-        if str(guild.id) in self.bot.guild_settings:
-            if "msg_edit_channel_id" in self.bot.guild_settings[str(guild.id)]:
-                msg_edit_channel = guild.get_channel(self.bot.guild_settings[str(guild.id)]["msg_edit_channel_id"])
-        return msg_edit_channel
+        msg_edit_channel_id = self.getSettings(guild).msg_edit_channel_id
+        return guild.get_channel(msg_edit_channel_id) if msg_edit_channel_id else None
 
     def getNickUpdateChannel(self, guild: discord.Guild) -> discord.TextChannel:
-        nick_edit_channel = None
-        if str(guild.id) in self.bot.guild_settings:
-            if "nick_edit_channel_id" in self.bot.guild_settings[str(guild.id)]:
-                nick_edit_channel = guild.get_channel(self.bot.guild_settings[str(guild.id)]["nick_edit_channel_id"])
-        return nick_edit_channel
+        nick_edit_channel_id = self.getSettings(guild).nick_edit_channel_id
+        return guild.get_channel(nick_edit_channel_id) if nick_edit_channel_id else None
 
     def getMemberTimeoutChannel(self, guild: discord.Guild) -> discord.TextChannel:
-        member_timeout_channel = None
-        if str(guild.id) in self.bot.guild_settings:
-            if "member_timeout_channel_id" in self.bot.guild_settings[str(guild.id)]:
-                member_timeout_channel = guild.get_channel(self.bot.guild_settings[str(guild.id)]["member_timeout_channel_id"])
-        return member_timeout_channel
+        member_timeout_channel_id = self.getSettings(guild).member_timeout_channel_id
+        return guild.get_channel(member_timeout_channel_id) if member_timeout_channel_id else None
 
     def getRoleUpdateChannel(self, guild: discord.Guild) -> discord.TextChannel:
-        role_update_channel = None
-        if str(guild.id) in self.bot.guild_settings:
-            if "role_update_channel_id" in self.bot.guild_settings[str(guild.id)]:
-                role_update_channel = guild.get_channel(self.bot.guild_settings[str(guild.id)]["role_update_channel_id"])
-        return role_update_channel
+        role_update_channel_id = self.getSettings(guild).role_update_channel_id
+        return guild.get_channel(role_update_channel_id) if role_update_channel_id else None
 
     def isLogBotActionsEnabled(self, guild: discord.Guild) -> bool:
-        log_bot_actions = True
-        if str(guild.id) in self.bot.guild_settings:
-            if "log_bot_actions" in self.bot.guild_settings[str(guild.id)]:
-                log_bot_actions = self.bot.guild_settings[str(guild.id)]["log_bot_actions"]
-        return log_bot_actions
+        return self.getSettings(guild).log_bot_actions
+
+    def getLogBatchDelay(self, guild: discord.Guild) -> int:
+        return self.getSettings(guild).log_batch_delay
 
     def getPrefix(self, guild: discord.Guild) -> str:
-        prefix = self.bot.default_prefix
-        if str(guild.id) in self.bot.guild_settings:
-            if "prefix" in self.bot.guild_settings[str(guild.id)]:
-                prefix = self.bot.guild_settings[str(guild.id)]["prefix"]
-        return prefix
+        return self.getSettings(guild).prefix or self.bot.default_prefix
 
     # BUTTON METHODS
     async def toggleReportSelf(self, interaction: discord.Interaction, main_view: discord.ui.View):
         guild_id = interaction.guild.id
         report_self = not self.isReportSelfEnabled(guild=interaction.guild)
 
-        # Save to postgreSQL
-        query = "UPDATE guilds SET report_self = $1 WHERE guild_id = $2;"
-        async with self.bot.pool.acquire() as conn:
-            async with conn.transaction():
-                await conn.execute(query, report_self, guild_id)
-
-        # Save in memory
-        self.bot.guild_settings[str(guild_id)]["report_self"] = report_self
+        # Save in memory, and to postgreSQL on the next flush
+        self.bot.services.settings_store.save(guild_id, report_self=report_self)
 
         await main_view.refreshEmbed(interaction=interaction, reloadView=True)  # Update main embed
 
@@ -613,14 +712,8 @@ class SettingsCommand(commands.Cog):
         guild_id = interaction.guild.id
         report_bots = not self.isReportBotsEnabled(guild=interaction.guild)
 
-        # Save to postgreSQL
-        query = "UPDATE guilds SET report_bots = $1 WHERE guild_id = $2;"
-        async with self.bot.pool.acquire() as conn:
-            async with conn.transaction():
-                await conn.execute(query, report_bots, guild_id)
-
-        # Save in memory
-        self.bot.guild_settings[str(guild_id)]["report_bots"] = report_bots
+        # Save in memory, and to postgreSQL on the next flush
+        self.bot.services.settings_store.save(guild_id, report_bots=report_bots)
 
         await main_view.refreshEmbed(interaction=interaction, reloadView=True)  # Update main embed
 
@@ -628,14 +721,8 @@ class SettingsCommand(commands.Cog):
         guild_id = interaction.guild.id
         report_admins = not self.isReportAdminsEnabled(guild=interaction.guild)
 
-        # Save to postgreSQL
-        query = "UPDATE guilds SET report_admins = $1 WHERE guild_id = $2;"
-        async with self.bot.pool.acquire() as conn:
-            async with conn.transaction():
-                await conn.execute(query, report_admins, guild_id)
-
-        # Save in memory
-        self.bot.guild_settings[str(guild_id)]["report_admins"] = report_admins
+        # Save in memory, and to postgreSQL on the next flush
+        self.bot.services.settings_store.save(guild_id, report_admins=report_admins)
 
         await main_view.refreshEmbed(interaction=interaction, reloadView=True)  # Update main embed
 
@@ -643,14 +730,8 @@ class SettingsCommand(commands.Cog):
         guild_id = interaction.guild.id
         invite_filter = not self.isInviteFilterEnabled(guild=interaction.guild)
 
-        # Save to postgreSQL
-        query = "UPDATE guilds SET invite_filter = $1 WHERE guild_id = $2;"
-        async with self.bot.pool.acquire() as conn:
-            async with conn.transaction():
-                await conn.execute(query, invite_filter, guild_id)
-
-        # Save in memory
-        self.bot.guild_settings[str(guild_id)]["invite_filter"] = invite_filter
+        # Save in memory, and to postgreSQL on the next flush
+        self.bot.services.settings_store.save(guild_id, invite_filter=invite_filter)
 
         await main_view.refreshEmbed(interaction=interaction, reloadView=True)  # Update main embed
 
@@ -658,14 +739,8 @@ class SettingsCommand(commands.Cog):
         guild_id = interaction.guild.id
         link_filter = not self.isLinkFilterEnabled(guild=interaction.guild)
 
-        # Save to postgreSQL
-        query = "UPDATE guilds SET link_filter = $1 WHERE guild_id = $2;"
-        async with self.bot.pool.acquire() as conn:
-            async with conn.transaction():
-                await conn.execute(query, link_filter, guild_id)
-
-        # Save in memory
-        self.bot.guild_settings[str(guild_id)]["link_filter"] = link_filter
+        # Save in memory, and to postgreSQL on the next flush
+        self.bot.services.settings_store.save(guild_id, link_filter=link_filter)
 
         await main_view.refreshEmbed(interaction=interaction, reloadView=True)  # Update main embed
 
@@ -673,15 +748,8 @@ class SettingsCommand(commands.Cog):
         guild_id = interaction.guild.id
         log_bot_actions = not self.isLogBotActionsEnabled(guild=interaction.guild)
 
-        # Save to postgreSQL
-        query = "UPDATE guilds SET log_bot_actions = $1 WHERE guild_id = $2;"
-        async with self.bot.pool.acquire() as conn:
-            async with conn.transaction():
-                await conn.execute(query, log_bot_actions, guild_id)
-
-        # Save in memory
-        self.bot.guild_settings[str(guild_id)]["log_bot_actions"] = log_bot_actions
-        # log.info(self.bot.guild_settings[str(guild_id)])
+        # Save in memory, and to postgreSQL on the next flush
+        self.bot.services.settings_store.save(guild_id, log_bot_actions=log_bot_actions)
 
         await main_view.refreshEmbed(interaction=interaction, reloadView=True)  # Update main embed
 
@@ -711,15 +779,9 @@ class SettingsCommand(commands.Cog):
             if reportsChannel == "none" or reportsChannel == "reset":
                 embed = discord.Embed(title="Channel reset", description="You have removed the Reports Channel.", colour=discord.Colour.green())
 
-                if "reports_channel_id" in self.bot.guild_settings[str(guild_id)]:
-                    # Save to postgreSQL - NONE
-                    query = "UPDATE guilds SET reports_channel_id = $1 WHERE guild_id = $2;"
-                    async with self.bot.pool.acquire() as conn:
-                        async with conn.transaction():
-                            await conn.execute(query, None, guild_id)
-
-                    # Save in memory
-                    del self.bot.guild_settings[str(guild_id)]["reports_channel_id"]
+                if self.main_view.cog.getSettings(interaction.guild).reports_channel_id is not None:
+                    # Save in memory, and to postgreSQL on the next flush
+                    self.bot.services.settings_store.save(guild_id, reports_channel_id=None)
 
                     await self.main_view.refreshEmbed()
 
@@ -730,14 +792,8 @@ class SettingsCommand(commands.Cog):
             else:
                 embed = discord.Embed(title="Reports Channel Updated", description=f"Successfully updated the reports channel to {channel.mention}", colour=discord.Colour.green())
 
-                # Save to postgreSQL
-                query = "UPDATE guilds SET reports_channel_id = $1 WHERE guild_id = $2;"
-                async with self.bot.pool.acquire() as conn:
-                    async with conn.transaction():
-                        await conn.execute(query, channel.id, guild_id)
-
-                # Save in memory
-                self.bot.guild_settings[str(guild_id)]["reports_channel_id"] = channel.id
+                # Save in memory, and to postgreSQL on the next flush
+                self.bot.services.settings_store.save(guild_id, reports_channel_id=channel.id)
 
                 await self.main_view.refreshEmbed()
 
@@ -768,15 +824,9 @@ class SettingsCommand(commands.Cog):
             if reportsRole == "none" or reportsRole == "reset":
                 embed = discord.Embed(title="Role reset", description="You have removed the Alert Role.", colour=discord.Colour.green())
 
-                if "reports_alert_role_id" in self.bot.guild_settings[str(guild_id)]:
-                    # Save to postgreSQL - NONE
-                    query = "UPDATE guilds SET reports_alert_role_id = $1 WHERE guild_id = $2;"
-                    async with self.bot.pool.acquire() as conn:
-                        async with conn.transaction():
-                            await conn.execute(query, None, guild_id)
-
-                    # Save in memory
-                    del self.bot.guild_settings[str(guild_id)]["reports_alert_role_id"]
+                if self.main_view.cog.getSettings(interaction.guild).reports_alert_role_id is not None:
+                    # Save in memory, and to postgreSQL on the next flush
+                    self.bot.services.settings_store.save(guild_id, reports_alert_role_id=None)
 
                     await self.main_view.refreshEmbed()
 
@@ -790,14 +840,8 @@ class SettingsCommand(commands.Cog):
                 embed.description = f"Successfully updated the reports alert role to {role.mention}"
                 embed.colour = discord.Colour.green()
 
-                # Save to postgreSQL
-                query = "UPDATE guilds SET reports_alert_role_id = $1 WHERE guild_id = $2;"
-                async with self.bot.pool.acquire() as conn:
-                    async with conn.transaction():
-                        await conn.execute(query, role.id, guild_id)
-
-                # Save in memory
-                self.bot.guild_settings[str(guild_id)]["reports_alert_role_id"] = role.id
+                # Save in memory, and to postgreSQL on the next flush
+                self.bot.services.settings_store.save(guild_id, reports_alert_role_id=role.id)
 
                 await self.main_view.refreshEmbed()
 
@@ -828,15 +872,9 @@ class SettingsCommand(commands.Cog):
             if bannedRole == "none" or bannedRole == "reset":
                 embed = discord.Embed(title="Role reset", description="You have removed the Banned Role.", colour=discord.Colour.green())
 
-                if "reports_banned_role_id" in self.bot.guild_settings[str(guild_id)]:
-                    # Save to postgreSQL - NONE
-                    query = "UPDATE guilds SET reports_banned_role_id = $1 WHERE guild_id = $2;"
-                    async with self.bot.pool.acquire() as conn:
-                        async with conn.transaction():
-                            await conn.execute(query, None, guild_id)
-
-                    # Save in memory
-                    del self.bot.guild_settings[str(guild_id)]["reports_banned_role_id"]
+                if self.main_view.cog.getSettings(interaction.guild).reports_banned_role_id is not None:
+                    # Save in memory, and to postgreSQL on the next flush
+                    self.bot.services.settings_store.save(guild_id, reports_banned_role_id=None)
 
                     await self.main_view.refreshEmbed()
 
@@ -849,14 +887,8 @@ class SettingsCommand(commands.Cog):
                 embed.description = f"Successfully updated the reports banned role to {role.mention}"
                 embed.colour = discord.Colour.green()
 
-                # Save to postgreSQL
-                query = "UPDATE guilds SET reports_banned_role_id = $1 WHERE guild_id = $2;"
-                async with self.bot.pool.acquire() as conn:
-                    async with conn.transaction():
-                        await conn.execute(query, role.id, guild_id)
-
-                # Save in memory
-                self.bot.guild_settings[str(guild_id)]["reports_banned_role_id"] = role.id
+                # Save in memory, and to postgreSQL on the next flush
+                self.bot.services.settings_store.save(guild_id, reports_banned_role_id=role.id)
 
                 await self.main_view.refreshEmbed()
 
@@ -892,7 +924,7 @@ class SettingsCommand(commands.Cog):
                                       colour=discord.Colour.dark_red())
             else:
                 guild_id = interaction.guild.id
-                whitelisted_links = self.main_view.cog.getWhitelistedLinks(interaction.guild)
+                whitelisted_links = list(self.main_view.cog.getWhitelistedLinks(interaction.guild))
 
                 msg = []
 
@@ -944,14 +976,8 @@ class SettingsCommand(commands.Cog):
                             whitelisted_links.remove(link)
                             msg.append(f'Removed `{link}`')
 
-                # Save to postgreSQL
-                query = "UPDATE guilds SET whitelisted_links = $1 WHERE guild_id = $2;"
-                async with self.bot.pool.acquire() as conn:
-                    async with conn.transaction():
-                        await conn.execute(query, whitelisted_links, guild_id)
-
-                # Save in memory
-                self.bot.guild_settings[str(guild_id)]["whitelisted_links"] = whitelisted_links
+                # Save in memory, and to postgreSQL on the next flush
+                self.bot.services.settings_store.save(guild_id, whitelisted_links=whitelisted_links)
 
                 embed = discord.Embed(title="Link Whitelist Updated")
                 embed.description = '\n'.join(msg)[0:4000]
@@ -992,7 +1018,7 @@ class SettingsCommand(commands.Cog):
                                       colour=discord.Colour.dark_red())
             else:
                 guild_id = interaction.guild.id
-                chat_filter = self.main_view.cog.getChatFilter(interaction.guild)
+                chat_filter = list(self.main_view.cog.getChatFilter(interaction.guild))
                 msg = []
 
                 if add:
@@ -1029,14 +1055,8 @@ class SettingsCommand(commands.Cog):
                             else:
                                 msg.append(f'`{word}` is not in the filter')
 
-                # Save to postgreSQL
-                query = "UPDATE guilds SET chat_filter = $1 WHERE guild_id = $2;"
-                async with self.bot.pool.acquire() as conn:
-                    async with conn.transaction():
-                        await conn.execute(query, chat_filter, guild_id)
-
-                # Save in memory
-                self.bot.guild_settings[str(guild_id)]["chat_filter"] = chat_filter
+                # Save in memory, and to postgreSQL on the next flush
+                self.bot.services.settings_store.save(guild_id, chat_filter=chat_filter)
 
                 embed = discord.Embed(title="Chat Filter Updated")
                 embed.description = '\n'.join(msg)[0:4000]
@@ -1072,15 +1092,9 @@ class SettingsCommand(commands.Cog):
             if modLogChannel == "none" or modLogChannel == "reset":
                 embed = discord.Embed(title="Channel reset", description="You have removed the Mod Log Channel.", colour=discord.Colour.green())
 
-                if "mod_log_channel_id" in self.bot.guild_settings[str(guild_id)]:
-                    # Save to postgreSQL - NONE
-                    query = "UPDATE guilds SET mod_log_channel_id = $1 WHERE guild_id = $2;"
-                    async with self.bot.pool.acquire() as conn:
-                        async with conn.transaction():
-                            await conn.execute(query, None, guild_id)
-
-                    # Save in memory
-                    del self.bot.guild_settings[str(guild_id)]["mod_log_channel_id"]
+                if self.main_view.cog.getSettings(interaction.guild).mod_log_channel_id is not None:
+                    # Save in memory, and to postgreSQL on the next flush
+                    self.bot.services.settings_store.save(guild_id, mod_log_channel_id=None)
 
                     await self.main_view.refreshEmbed()
 
@@ -1091,14 +1105,8 @@ class SettingsCommand(commands.Cog):
             else:
                 embed = discord.Embed(title="Mod Log Channel Updated", description=f"Successfully updated the mod log channel to {channel.mention}", colour=discord.Colour.green())
 
-                # Save to postgreSQL
-                query = "UPDATE guilds SET mod_log_channel_id = $1 WHERE guild_id = $2;"
-                async with self.bot.pool.acquire() as conn:
-                    async with conn.transaction():
-                        await conn.execute(query, channel.id, guild_id)
-
-                # Save in memory
-                self.bot.guild_settings[str(guild_id)]["mod_log_channel_id"] = channel.id
+                # Save in memory, and to postgreSQL on the next flush
+                self.bot.services.settings_store.save(guild_id, mod_log_channel_id=channel.id)
 
                 await self.main_view.refreshEmbed()
 
@@ -1129,15 +1137,9 @@ class SettingsCommand(commands.Cog):
             if msgDeleteChannel == "none" or msgDeleteChannel == "reset":
                 embed = discord.Embed(title="Channel reset", description="You have removed the Message Delete Channel.", colour=discord.Colour.green())
 
-                if "msg_delete_channel_id" in self.bot.guild_settings[str(guild_id)]:
-                    # Save to postgreSQL - NONE
-                    query = "UPDATE guilds SET msg_delete_channel_id = $1 WHERE guild_id = $2;"
-                    async with self.bot.pool.acquire() as conn:
-                        async with conn.transaction():
-                            await conn.execute(query, None, guild_id)
-
-                    # Save in memory
-                    del self.bot.guild_settings[str(guild_id)]["msg_delete_channel_id"]
+                if self.main_view.cog.getSettings(interaction.guild).msg_delete_channel_id is not None:
+                    # Save in memory, and to postgreSQL on the next flush
+                    self.bot.services.settings_store.save(guild_id, msg_delete_channel_id=None)
 
                     await self.main_view.refreshEmbed()
 
@@ -1148,19 +1150,12 @@ class SettingsCommand(commands.Cog):
             else:
                 embed = discord.Embed(title="Message Delete Channel Updated", description=f"Successfully updated the message delete channel to {channel.mention}", colour=discord.Colour.green())
 
-                # Save to postgreSQL
-                query = "UPDATE guilds SET msg_delete_channel_id = $1 WHERE guild_id = $2;"
-                async with self.bot.pool.acquire() as conn:
-                    async with conn.transaction():
-                        await conn.execute(query, channel.id, guild_id)
-
-                # Save in memory
-                self.bot.guild_settings[str(guild_id)]["msg_delete_channel_id"] = channel.id
+                # Save in memory, and to postgreSQL on the next flush
+                self.bot.services.settings_store.save(guild_id, msg_delete_channel_id=channel.id)
 
                 await self.main_view.refreshEmbed()
 
             await interaction.response.send_message(embed=embed, ephemeral=True)
-            # log.info(self.bot.guild_settings[str(guild_id)])
 
     class ModMessageDeleteChannelModel(ui.Modal):
         def __init__(self, bot=None, main_view=None):
@@ -1187,15 +1182,9 @@ class SettingsCommand(commands.Cog):
             if modMsgDeleteChannel == "none" or modMsgDeleteChannel == "reset":
                 embed = discord.Embed(title="Channel reset", description="You have removed the Mod Message Delete Channel.", colour=discord.Colour.green())
 
-                if "mod_msg_delete_channel_id" in self.bot.guild_settings[str(guild_id)]:
-                    # Save to postgreSQL - NONE
-                    query = "UPDATE guilds SET mod_msg_delete_channel_id = $1 WHERE guild_id = $2;"
-                    async with self.bot.pool.acquire() as conn:
-                        async with conn.transaction():
-                            await conn.execute(query, None, guild_id)
-
-                    # Save in memory
-                    del self.bot.guild_settings[str(guild_id)]["mod_msg_delete_channel_id"]
+                if self.main_view.cog.getSettings(interaction.guild).mod_msg_delete_channel_id is not None:
+                    # Save in memory, and to postgreSQL on the next flush
+                    self.bot.services.settings_store.save(guild_id, mod_msg_delete_channel_id=None)
 
                     await self.main_view.refreshEmbed()
 
@@ -1207,19 +1196,12 @@ class SettingsCommand(commands.Cog):
                 embed = discord.Embed(title="Mod Message Delete Channel Updated", description=f"Successfully updated the mod message delete channel to {channel.mention}",
                                       colour=discord.Colour.green())
 
-                # Save to postgreSQL
-                query = "UPDATE guilds SET mod_msg_delete_channel_id = $1 WHERE guild_id = $2;"
-                async with self.bot.pool.acquire() as conn:
-                    async with conn.transaction():
-                        await conn.execute(query, channel.id, guild_id)
-
-                # Save in memory
-                self.bot.guild_settings[str(guild_id)]["mod_msg_delete_channel_id"] = channel.id
+                # Save in memory, and to postgreSQL on the next flush
+                self.bot.services.settings_store.save(guild_id, mod_msg_delete_channel_id=channel.id)
 
                 await self.main_view.refreshEmbed()
 
             await interaction.response.send_message(embed=embed, ephemeral=True)
-            # log.info(self.bot.guild_settings[str(guild_id)])
 
     class MessageEditChannelModel(ui.Modal):
         def __init__(self, bot=None, main_view=None):
@@ -1246,15 +1228,9 @@ class SettingsCommand(commands.Cog):
             if msgEditChannel == "none" or msgEditChannel == "reset":
                 embed = discord.Embed(title="Channel reset", description="You have removed the Message Edit Channel.", colour=discord.Colour.green())
 
-                if "msg_edit_channel_id" in self.bot.guild_settings[str(guild_id)]:
-                    # Save to postgreSQL - NONE
-                    query = "UPDATE guilds SET msg_edit_channel_id = $1 WHERE guild_id = $2;"
-                    async with self.bot.pool.acquire() as conn:
-                        async with conn.transaction():
-                            await conn.execute(query, None, guild_id)
-
-                    # Save in memory
-                    del self.bot.guild_settings[str(guild_id)]["msg_edit_channel_id"]
+                if self.main_view.cog.getSettings(interaction.guild).msg_edit_channel_id is not None:
+                    # Save in memory, and to postgreSQL on the next flush
+                    self.bot.services.settings_store.save(guild_id, msg_edit_channel_id=None)
 
                     await self.main_view.refreshEmbed()
 
@@ -1266,19 +1242,12 @@ class SettingsCommand(commands.Cog):
                 embed = discord.Embed(title="Message Edit Channel Updated", description=f"Successfully updated the message edit channel to {channel.mention}",
                                       colour=discord.Colour.green())
 
-                # Save to postgreSQL
-                query = "UPDATE guilds SET msg_edit_channel_id = $1 WHERE guild_id = $2;"
-                async with self.bot.pool.acquire() as conn:
-                    async with conn.transaction():
-                        await conn.execute(query, channel.id, guild_id)
-
-                # Save in memory
-                self.bot.guild_settings[str(guild_id)]["msg_edit_channel_id"] = channel.id
+                # Save in memory, and to postgreSQL on the next flush
+                self.bot.services.settings_store.save(guild_id, msg_edit_channel_id=channel.id)
 
                 await self.main_view.refreshEmbed()
 
             await interaction.response.send_message(embed=embed, ephemeral=True)
-            # log.info(self.bot.guild_settings[str(guild_id)])
 
     class NicknameEditChannelModel(ui.Modal):
         def __init__(self, bot=None, main_view=None):
@@ -1305,15 +1274,9 @@ class SettingsCommand(commands.Cog):
             if nickEditChannel == "none" or nickEditChannel == "reset":
                 embed = discord.Embed(title="Channel reset", description="You have removed the Nickname Edit Channel.", colour=discord.Colour.green())
 
-                if "nick_edit_channel_id" in self.bot.guild_settings[str(guild_id)]:
-                    # Save to postgreSQL - NONE
-                    query = "UPDATE guilds SET nick_edit_channel_id = $1 WHERE guild_id = $2;"
-                    async with self.bot.pool.acquire() as conn:
-                        async with conn.transaction():
-                            await conn.execute(query, None, guild_id)
-
-                    # Save in memory
-                    del self.bot.guild_settings[str(guild_id)]["nick_edit_channel_id"]
+                if self.main_view.cog.getSettings(interaction.guild).nick_edit_channel_id is not None:
+                    # Save in memory, and to postgreSQL on the next flush
+                    self.bot.services.settings_store.save(guild_id, nick_edit_channel_id=None)
 
                     await self.main_view.refreshEmbed()
 
@@ -1325,19 +1288,12 @@ class SettingsCommand(commands.Cog):
                 embed = discord.Embed(title="Nickname Edit Channel Updated", description=f"Successfully updated the nickname edit channel to {channel.mention}",
                                       colour=discord.Colour.green())
 
-                # Save to postgreSQL
-                query = "UPDATE guilds SET nick_edit_channel_id = $1 WHERE guild_id = $2;"
-                async with self.bot.pool.acquire() as conn:
-                    async with conn.transaction():
-                        await conn.execute(query, channel.id, guild_id)
-
-                # Save in memory
-                self.bot.guild_settings[str(guild_id)]["nick_edit_channel_id"] = channel.id
+                # Save in memory, and to postgreSQL on the next flush
+                self.bot.services.settings_store.save(guild_id, nick_edit_channel_id=channel.id)
 
                 await self.main_view.refreshEmbed()
 
             await interaction.response.send_message(embed=embed, ephemeral=True)
-            # log.info(self.bot.guild_settings[str(guild_id)])
 
     class MemberTimeoutChannelModel(ui.Modal):
         def __init__(self, bot=None, main_view=None):
@@ -1364,15 +1320,9 @@ class SettingsCommand(commands.Cog):
             if memTimeoutChannel == "none" or memTimeoutChannel == "reset":
                 embed = discord.Embed(title="Channel reset", description="You have removed the Member Timeout Channel.", colour=discord.Colour.green())
 
-                if "member_timeout_channel_id" in self.bot.guild_settings[str(guild_id)]:
-                    # Save to postgreSQL - NONE
-                    query = "UPDATE guilds SET member_timeout_channel_id = $1 WHERE guild_id = $2;"
-                    async with self.bot.pool.acquire() as conn:
-                        async with conn.transaction():
-                            await conn.execute(query, None, guild_id)
-
-                    # Save in memory
-                    del self.bot.guild_settings[str(guild_id)]["member_timeout_channel_id"]
+                if self.main_view.cog.getSettings(interaction.guild).member_timeout_channel_id is not None:
+                    # Save in memory, and to postgreSQL on the next flush
+                    self.bot.services.settings_store.save(guild_id, member_timeout_channel_id=None)
 
                     await self.main_view.refreshEmbed()
 
@@ -1384,19 +1334,12 @@ class SettingsCommand(commands.Cog):
                 embed = discord.Embed(title="Member Timeout Channel Updated", description=f"Successfully updated the member timeout channel to {channel.mention}",
                                       colour=discord.Colour.green())
 
-                # Save to postgreSQL
-                query = "UPDATE guilds SET member_timeout_channel_id = $1 WHERE guild_id = $2;"
-                async with self.bot.pool.acquire() as conn:
-                    async with conn.transaction():
-                        await conn.execute(query, channel.id, guild_id)
-
-                # Save in memory
-                self.bot.guild_settings[str(guild_id)]["member_timeout_channel_id"] = channel.id
+                # Save in memory, and to postgreSQL on the next flush
+                self.bot.services.settings_store.save(guild_id, member_timeout_channel_id=channel.id)
 
                 await self.main_view.refreshEmbed()
 
             await interaction.response.send_message(embed=embed, ephemeral=True)
-            # log.info(self.bot.guild_settings[str(guild_id)])
 
     class RoleUpdateChannelModel(ui.Modal):
         def __init__(self, bot=None, main_view=None):
@@ -1423,15 +1366,9 @@ class SettingsCommand(commands.Cog):
             if roleUpdateChannel == "none" or roleUpdateChannel == "reset":
                 embed = discord.Embed(title="Channel reset", description="You have removed the Role Update Channel.", colour=discord.Colour.green())
 
-                if "role_update_channel_id" in self.bot.guild_settings[str(guild_id)]:
-                    # Save to postgreSQL - NONE
-                    query = "UPDATE guilds SET role_update_channel_id = $1 WHERE guild_id = $2;"
-                    async with self.bot.pool.acquire() as conn:
-                        async with conn.transaction():
-                            await conn.execute(query, None, guild_id)
-
-                    # Save in memory
-                    del self.bot.guild_settings[str(guild_id)]["role_update_channel_id"]
+                if self.main_view.cog.getSettings(interaction.guild).role_update_channel_id is not None:
+                    # Save in memory, and to postgreSQL on the next flush
+                    self.bot.services.settings_store.save(guild_id, role_update_channel_id=None)
 
                     await self.main_view.refreshEmbed()
 
@@ -1443,19 +1380,52 @@ class SettingsCommand(commands.Cog):
                 embed = discord.Embed(title="Role Update Channel Updated", description=f"Successfully updated the role update channel to {channel.mention}",
                                       colour=discord.Colour.green())
 
-                # Save to postgreSQL
-                query = "UPDATE guilds SET role_update_channel_id = $1 WHERE guild_id = $2;"
-                async with self.bot.pool.acquire() as conn:
-                    async with conn.transaction():
-                        await conn.execute(query, channel.id, guild_id)
-
-                # Save in memory
-                self.bot.guild_settings[str(guild_id)]["role_update_channel_id"] = channel.id
+                # Save in memory, and to postgreSQL on the next flush
+                self.bot.services.settings_store.save(guild_id, role_update_channel_id=channel.id)
 
                 await self.main_view.refreshEmbed()
 
             await interaction.response.send_message(embed=embed, ephemeral=True)
-            # log.info(self.bot.guild_settings[str(guild_id)])
+
+    class LogBatchingModel(ui.Modal):
+        def __init__(self, bot=None, main_view=None):
+            super().__init__(title="Log Batching")
+            self.bot = bot
+            self.main_view = main_view
+
+        delay = ui.TextInput(label='Batch Delay (seconds)', style=discord.TextStyle.short,
+                             placeholder="Enter how many seconds logs can wait, from 1 to 60. Enter 0 to disable",
+                             required=True, max_length=2)
+
+        async def on_error(self, interaction: discord.Interaction, error: Exception) -> None:
+            log.exception(error)
+            if interaction.response.is_done():
+                await interaction.followup.send('An unknown error occurred, sorry', ephemeral=True)
+            else:
+                await interaction.response.send_message('An unknown error occurred, sorry', ephemeral=True)
+
+        async def on_submit(self, interaction: Interaction):
+            guild_id = interaction.guild.id
+            delay = self.delay.value.strip()
+
+            if not delay.isdigit() or int(delay) > 60:
+                embed = discord.Embed(title="Invalid delay",
+                                      description="Please enter a whole number of seconds from 1 to 60.\nTo disable log batching, enter `0`.",
+                                      colour=discord.Colour.dark_red())
+                return await interaction.response.send_message(embed=embed, ephemeral=True)
+
+            delay = int(delay)
+            if delay == 0:
+                embed = discord.Embed(title="Log Batching Disabled", description="Logs will now be sent as soon as they happen.", colour=discord.Colour.green())
+            else:
+                embed = discord.Embed(title="Log Batching Updated", description=f"Logs will now be sent together at most {delay} seconds after they happen.",
+                                      colour=discord.Colour.green())
+
+            # Save in memory, and to postgreSQL on the next flush
+            self.bot.services.settings_store.save(guild_id, log_batch_delay=delay or None)
+
+            await self.main_view.refreshEmbed()
+            await interaction.response.send_message(embed=embed, ephemeral=True)
 
     class PrefixModel(ui.Modal):
         def __init__(self, bot=None, main_view=None):
@@ -1478,17 +1448,13 @@ class SettingsCommand(commands.Cog):
             new_prefix = self.prefix.value
             guild_id = interaction.guild.id
 
-            # Save to postgreSQL
-            query = "UPDATE guilds SET prefix = $1 WHERE guild_id = $2;"
-            async with self.bot.pool.acquire() as conn:
-                async with conn.transaction():
-                    await conn.execute(query, new_prefix, guild_id)
-
-            # Save in memory
-            self.bot.guild_settings[str(guild_id)]["prefix"] = new_prefix
+            # Save in memory, and to postgreSQL on the next flush
+            self.bot.services.settings_store.save(guild_id, prefix=new_prefix)
 
             await self.main_view.refreshEmbed(interaction=interaction)  # Update main embed
 
 
 async def setup(bot):
+    if not hasattr(bot, 'guild_settings'):
+        bot.guild_settings = {}
     await bot.add_cog(SettingsCommand(bot))
@@ -0,0 +1,287 @@
+import asyncio
+import logging
+import time
+from array import array
+from collections import deque
+from datetime import timedelta
+from typing import Callable, Optional
+
+import discord
+from discord.ext import commands, tasks
+
+log = logging.getLogger(__name__)
+
+AUDIT_LOG_TTL = 1.0  # seconds a fetched audit log is reused for
+FETCH_LIMIT = 10  # entries kept per guild and action, the most any handler asks for
+STREAM_SIZE = 50  # entries kept per guild from the gateway
+STREAM_WAIT = 2.0  # seconds to wait for an entry to arrive from the gateway before fetching the audit log
+STREAM_MAX_AGE = timedelta(seconds=5)  # older gateway entries are from an earlier action, not the event being handled
+
+# Discord stacks repeated actions into one entry and bumps its count, so an existing entry can change.
+# A fetch with after= only returns new entries, so these actions are always fetched in full.
+STACKING_ACTIONS = frozenset({
+    discord.AuditLogAction.message_delete,
+    discord.AuditLogAction.member_move,
+    discord.AuditLogAction.member_disconnect,
+})
+
+
+DELETE_LOG_MAX_AGE = timedelta(days=1)  # older message delete entries are dropped from the delete log cache
+DELETE_LOG_MAX_ENTRIES = FETCH_LIMIT * 2  # only the newest entries are ever fetched, so older ones can't be looked up again
+
+
+class GuildDeleteLog:
+    """ Message delete entry ids and counts for one guild, newest first, stored as two parallel arrays """
+    __slots__ = ('ids', 'counts')
+
+    def __init__(self):
+        self.ids = array('Q')
+        self.counts = array('L')
+
+
+class DeleteLogCache:
+    """ The last seen count of each message delete audit log entry, so handlers can tell when a stacked entry's count went up.
+    Kept per guild, limited to the newest DELETE_LOG_MAX_ENTRIES entries and cleared of entries older than DELETE_LOG_MAX_AGE. """
+
+    __slots__ = ('_guilds', '_size')
+
+    def __init__(self):
+        self._guilds: dict[int, GuildDeleteLog] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get(self, guild_id: int, entry_id: int) -> Optional[int]:
+        guild_log = self._guilds.get(guild_id)
+        if guild_log is None:
+            return None
+        try:
+            return guild_log.counts[guild_log.ids.index(entry_id)]
+        except ValueError:
+            return None
+
+    def set(self, guild_id: int, entry_id: int, count: int):
+        guild_log = self._guilds.get(guild_id)
+        if guild_log is None:
+            guild_log = self._guilds[guild_id] = GuildDeleteLog()
+
+        try:
+            guild_log.counts[guild_log.ids.index(entry_id)] = count
+            return
+        except ValueError:
+            pass
+
+        # keep the arrays sorted newest first, new entries are nearly always the newest
+        i = 0
+        while i < len(guild_log.ids) and guild_log.ids[i] > entry_id:
+            i += 1
+        guild_log.ids.insert(i, entry_id)
+        guild_log.counts.insert(i, count)
+        self._size += 1
+
+        self.evict(guild_id, guild_log)
+
+    def evict(self, guild_id: int, guild_log: GuildDeleteLog):
+        oldest_id = discord.utils.time_snowflake(discord.utils.utcnow() - DELETE_LOG_MAX_AGE)
+
+        keep = len(guild_log.ids)
+        while keep and (keep > DELETE_LOG_MAX_ENTRIES or guild_log.ids[keep - 1] < oldest_id):
+            keep -= 1
+
+        if keep < len(guild_log.ids):
+            self._size -= len(guild_log.ids) - keep
+            del guild_log.ids[keep:]
+            del guild_log.counts[keep:]
+
+        if not guild_log.ids:
+            del self._guilds[guild_id]
+
+    def purge(self):
+        """ Drops old entries from every guild, including guilds that haven't had a message deleted in a while """
+        for guild_id, guild_log in list(self._guilds.items()):
+            self.evict(guild_id, guild_log)
+
+
+class CachedAuditLog:
+    __slots__ = ('entries', 'fetched_at', '_by_target')
+
+    def __init__(self, entries: list[discord.AuditLogEntry], fetched_at: float):
+        self.entries = entries  # newest first
+        self.fetched_at = fetched_at
+        self._by_target: Optional[dict[int, list[discord.AuditLogEntry]]] = None
+
+    def forTarget(self, target_id: int) -> list[discord.AuditLogEntry]:
+        """ The entries for one target, newest first. The index is built the first time it's needed """
+        if self._by_target is None:
+            self._by_target = {}
+            for entry in self.entries:
+                if entry.target is not None:
+                    self._by_target.setdefault(entry.target.id, []).append(entry)
+        return self._by_target.get(target_id, [])
+
+
+class AuditLogStream:
+    """ The audit log entries the gateway sent for one guild in the last STREAM_MAX_AGE, indexed by action and target """
+    __slots__ = ('entries', 'by_target')
+
+    def __init__(self):
+        self.entries: deque[discord.AuditLogEntry] = deque()  # newest first
+        self.by_target: dict[tuple[discord.AuditLogAction, int], deque[discord.AuditLogEntry]] = {}
+
+    @staticmethod
+    def key(entry: discord.AuditLogEntry) -> tuple[discord.AuditLogAction, Optional[int]]:
+        return entry.action, entry.target.id if entry.target is not None else None
+
+    def add(self, entry: discord.AuditLogEntry):
+        oldest = discord.utils.utcnow() - STREAM_MAX_AGE
+        while self.entries and (len(self.entries) >= STREAM_SIZE or self.entries[-1].created_at < oldest):
+            self.dropOldest()
+
+        self.entries.appendleft(entry)
+        self.by_target.setdefault(self.key(entry), deque()).appendleft(entry)
+
+    def dropOldest(self):
+        entry = self.entries.pop()
+        key = self.key(entry)
+        target_entries = self.by_target[key]
+        target_entries.pop()  # the oldest entry overall is also the oldest for its target
+        if not target_entries:
+            del self.by_target[key]
+
+    def isStale(self) -> bool:
+        return not self.entries or self.entries[0].created_at < discord.utils.utcnow() - STREAM_MAX_AGE
+
+    def find(self, action: discord.AuditLogAction, target_id: int, check: Callable[[discord.AuditLogEntry], bool]) -> Optional[discord.AuditLogEntry]:
+        oldest = discord.utils.utcnow() - STREAM_MAX_AGE
+        for entry in self.by_target.get((action, target_id), ()):  # newest first
+            if entry.created_at < oldest:
+                break
+            if check(entry):
+                return entry
+        return None
+
+
+class AuditLogCacheCog(commands.Cog):
+    """ Shares audit log fetches between handlers. Handlers that ask while a fetch is running wait for it instead of
+    making their own request, and apart from stacking actions a result is reused for AUDIT_LOG_TTL seconds.
+    Entries the gateway sends as they are created are kept too, so most lookups don't need a fetch at all. """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._cache: dict[tuple[int, discord.AuditLogAction], CachedAuditLog] = {}
+        self._fetching: dict[tuple[int, discord.AuditLogAction], asyncio.Task] = {}
+        self._streams: dict[int, AuditLogStream] = {}  # guild id to the entries sent by the gateway
+
+    async def cog_load(self) -> None:
+        self.bot.services.audit_cache = self
+        self.purge_loop.start()
+
+    async def cog_unload(self) -> None:
+        self.bot.services.audit_cache = None
+        self.purge_loop.stop()
+
+    async def fetch(self, guild: discord.Guild, action: discord.AuditLogAction, limit: int = FETCH_LIMIT) -> list[discord.AuditLogEntry]:
+        """ Returns the newest audit log entries for an action, newest first """
+        return (await self.fetchLog(guild, action)).entries[:limit]
+
+    async def findEntry(self, guild: discord.Guild, action: discord.AuditLogAction, target_id: int,
+                        check: Callable[[discord.AuditLogEntry], bool] = lambda entry: True, *,
+                        wait: float = STREAM_WAIT) -> Optional[discord.AuditLogEntry]:
+        """ Returns the newest entry for a target which passes check. Entries from the gateway are searched first, then
+        it waits up to wait seconds for the entry to arrive. Only if it still hasn't is the audit log fetched """
+        stream = self._streams.get(guild.id)
+        if stream is not None:
+            entry = stream.find(action, target_id, check)
+            if entry is not None:
+                return entry
+
+        if wait > 0 and guild.me.guild_permissions.view_audit_log:  # discord only sends entries to bots that can view them
+            def gatewayCheck(entry: discord.AuditLogEntry) -> bool:
+                return (entry.guild.id == guild.id and entry.action == action and entry.user is not None
+                        and entry.target is not None and entry.target.id == target_id and check(entry))
+
+            try:
+                return await self.bot.wait_for('audit_log_entry_create', check=gatewayCheck, timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+        requested_at = time.monotonic()
+        for fresh in (False, True):
+            cached = await self.fetchLog(guild, action, fresh=fresh)
+            for entry in cached.forTarget(target_id):
+                if check(entry):
+                    return entry
+            if cached.fetched_at >= requested_at:
+                break  # already fetched after we asked, fetching again won't find anything new
+        return None
+
+    async def fetchLog(self, guild: discord.Guild, action: discord.AuditLogAction, *, fresh: bool = False) -> CachedAuditLog:
+        """ Returns the shared fetch result for an action. fresh asks for a fetch that started after this call """
+        key = (guild.id, action)
+        requested_at = time.monotonic()
+        fresh = fresh or action in STACKING_ACTIONS
+
+        if not fresh:
+            cached = self._cache.get(key)
+            if cached is not None and requested_at - cached.fetched_at < AUDIT_LOG_TTL:
+                return cached
+
+        while True:
+            task = self._fetching.get(key)
+            if task is None or task.done():
+                task = self._fetching[key] = asyncio.create_task(self.refresh(guild, action))
+                task.add_done_callback(lambda _: self._fetching.pop(key, None))
+
+            cached = await asyncio.shield(task)  # one waiter being cancelled shouldn't cancel everyone's fetch
+
+            # a stacked entry's count may have gone up after a fetch started, so stacking actions need a fetch that
+            # started after they were asked for. Everyone who asks while a fetch is running shares the next one.
+            if not fresh or cached.fetched_at >= requested_at:
+                return cached
+
+    async def refresh(self, guild: discord.Guild, action: discord.AuditLogAction) -> CachedAuditLog:
+        fetched_at = time.monotonic()
+        cached = self._cache.get((guild.id, action))
+
+        if cached is not None and cached.entries and action not in STACKING_ACTIONS:
+            # only ask for what is newer than the newest entry we have
+            newest = discord.Object(id=cached.entries[0].id)
+            new_entries = [entry async for entry in guild.audit_logs(limit=FETCH_LIMIT, action=action, after=newest, oldest_first=False)]
+            entries = (new_entries + cached.entries)[:FETCH_LIMIT]
+        else:
+            entries = [entry async for entry in guild.audit_logs(limit=FETCH_LIMIT, action=action)]
+
+        cached = self._cache[(guild.id, action)] = CachedAuditLog(entries, fetched_at)
+        return cached
+
+    def invalidate(self, guild_id: int):
+        for key in [key for key in self._cache if key[0] == guild_id]:
+            del self._cache[key]
+        self._streams.pop(guild_id, None)
+
+    @commands.Cog.listener()
+    async def on_audit_log_entry_create(self, entry: discord.AuditLogEntry):
+        if entry.user is None:
+            return  # the user isn't cached, handlers will fetch the entry instead
+
+        stream = self._streams.get(entry.guild.id)
+        if stream is None:
+            stream = self._streams[entry.guild.id] = AuditLogStream()
+        stream.add(entry)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.invalidate(guild.id)
+
+    @tasks.loop(hours=1)
+    async def purge_loop(self):
+        self.bot.delete_log_cache.purge()
+        for guild_id in [guild_id for guild_id, stream in self._streams.items() if stream.isStale()]:
+            del self._streams[guild_id]
+
+
+async def setup(bot):
+    if not isinstance(getattr(bot, 'delete_log_cache', None), DeleteLogCache):
+        bot.delete_log_cache = DeleteLogCache()
+    await bot.add_cog(AuditLogCacheCog(bot))
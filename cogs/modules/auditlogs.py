@@ -1,11 +1,11 @@
-import asyncio
 import logging
-from datetime import timedelta
-from io import BytesIO
 
 import discord
 from discord.ext import commands
 
+from cogs._events.message import MessageView
+from cogs.modules.logrender import LogRecord, formatTime, formatTimeForFile
+
 log = logging.getLogger(__name__)
 
 
@@ -13,56 +13,39 @@ class AuditLogCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    async def handleEdit(self, before: discord.Message, after: discord.Message):
+    async def cog_load(self) -> None:
+        self.bot.services.audit_logs = self
+
+    async def cog_unload(self) -> None:
+        self.bot.services.audit_logs = None
+
+    async def handleEdit(self, before: MessageView, after: MessageView):
 
-        settingsCog = self.bot.get_cog("SettingsCommand")
+        settingsCog = self.bot.services.settings
         if after.author.bot and not settingsCog.isLogBotActionsEnabled(after.guild):
             return
 
-        embed = discord.Embed()
-        embed.set_author(name="Message Edited", icon_url=after.author.display_avatar.url)
-        embed.colour = discord.Colour(0x2F3136)
+        record = LogRecord("Message Edited", icon_url=after.author.display_avatar.url)
+        record.heading("Message's Info")
+        record.line('Message Author', f'{after.author.mention} ({discord.utils.escape_markdown(str(after.author))})', f'{after.author}')
+        record.line('Channel', after.channel.mention, f'#{after.channel}')
+        record.add(f'Created: {formatTime(after.created_at)}\n', f'Created (UTC): {formatTimeForFile(after.created_at)}\n')
+        record.line('Message ID', f'`{after.id}`', f'{after.id}')
+        record.line('Attachments', f'`{len(after.attachments)}`', f'{len(after.attachments)}')
 
-        content_before = before.clean_content.replace("`", "")
-        content_after = after.clean_content.replace("`", "")
+        record.heading("Message Content Before")
+        record.add(f'`{before.escaped_content}`\n', f'{before.clean_content}\n')
 
-        embed.description = f'**Message\'s Info:**\n' \
-                            f'Message Author: {after.author.mention} ({discord.utils.escape_markdown(str(after.author))})\n' \
-                            f'Channel: {after.channel.mention}\n' \
-                            f'Created: {discord.utils.format_dt(after.created_at, "F")} ({discord.utils.format_dt(after.created_at, "R")})\n' \
-                            f'Message ID: `{after.id}`\n' \
-                            f'Attachments: `{len(after.attachments)}`' \
-                            f'\n\n**Message Content Before:**\n`{content_before}`' \
-                            f'\n\n**Message Content After:**\n`{content_after}`'
-
-        if len(after.attachments) != 0:
-            attachement1 = after.attachments[0]
-            if attachement1.content_type.startswith("image"):
-                embed.set_image(url=attachement1.url)
-                embed.description += f"\n\n**Message Image:**"
-
-        file = None
-        content = None
-        if len(embed.description) > 4096 or len(embed) > 6000:
-            # attach as a file
-            embed = None
-            content = "**Message Edit!**"
-            fileContent = \
-                f'Message Author: {after.author}\n' \
-                f'Channel: #{after.channel}\n' \
-                f'Created (UTC): {after.created_at.strftime("%Y-%m-%d %H:%M-%S")}\n' \
-                f'Message ID: {after.id}\n' \
-                f'Attachments: {len(after.attachments)}' \
-                f'\n\nMessage Content Before:\n{before.clean_content}' \
-                f'\n\nMessage Content After:\n{after.clean_content}'
-
-            buffer = BytesIO(fileContent.encode('utf-8'))
-            file = discord.File(fp=buffer, filename='edited_message.txt')
+        record.heading("Message Content After")
+        record.add(f'`{after.escaped_content}`\n', f'{after.clean_content}\n')
+        record.messageImage(after)
+
+        content, embed, file = record.render("**Message Edit!**", 'edited_message.txt')
 
         view = discord.ui.View()
         view.add_item(discord.ui.Button(label="Jump to message", url=after.jump_url))
 
-        await settingsCog.getMsgEditChannel(after.guild).send(content=content, embed=embed, file=file, view=view)
+        await self.bot.services.log_buffer.send(settingsCog.getMsgEditChannel(after.guild), content=content, embed=embed, file=file, view=view)
 
     async def handleRawEdit(self, payload: discord.RawMessageUpdateEvent, guild: discord.Guild):
         """ Message before is unknown """
@@ -73,13 +56,11 @@ class AuditLogCog(commands.Cog):
         except discord.NotFound:  # message not found?
             return
 
-        settingsCog = self.bot.get_cog("SettingsCommand")
+        settingsCog = self.bot.services.settings
         if message.author.bot and not settingsCog.isLogBotActionsEnabled(guild):
             return
 
-        embed = discord.Embed()
-        embed.set_author(name="Message Edited", icon_url=message.author.display_avatar.url)
-        embed.colour = discord.Colour(0x2F3136)
+        record = LogRecord("Message Edited", icon_url=message.author.display_avatar.url)
 
         if message.content:
             content_after = message.clean_content.replace("`", "")  # remove so no messed up format
@@ -94,103 +75,47 @@ class AuditLogCog(commands.Cog):
                     content += f"\n{embed_.footer.text or ''}"
                     content_after = content.replace("`", "")
 
-        embed.description = f'**Message\'s Info:**\n' \
-                            f'Message Author: {message.author.mention} ({discord.utils.escape_markdown(str(message.author))})\n' \
-                            f'Channel: {message.channel.mention}\n' \
-                            f'Created: {discord.utils.format_dt(message.created_at, "F")} ({discord.utils.format_dt(message.created_at, "R")})\n' \
-                            f'Message ID: `{message.id}`\n' \
-                            f'Attachments: `{len(message.attachments)}`' \
-                            f'\n\n**Message Content Before:**\nUnknown' \
-                            f'\n\n**Message Content After:**\n`{content_after}`'
-
-        if len(message.attachments) != 0:
-            attachement1 = message.attachments[0]
-            if attachement1.content_type.startswith("image"):
-                embed.set_image(url=attachement1.url)
-                embed.description += f"\n\n**Message Image:**"
-
-        file = None
-        content = None
-        if len(embed.description) > 4096 or len(embed) > 6000:
-            # attach as a file
-            embed = None
-            content = "**Message Edit!**"
-            fileContent = \
-                f'Message Author: {message.author}\n' \
-                f'Channel: #{message.channel}\n' \
-                f'Created (UTC): {message.created_at.strftime("%Y-%m-%d %H:%M-%S")}\n' \
-                f'Message ID: {message.id}\n' \
-                f'Attachments: {len(message.attachments)}' \
-                f'\n\nMessage Content Before:\nUnknown' \
-                f'\n\nMessage Content After:\n{message.clean_content}'
-
-            buffer = BytesIO(fileContent.encode('utf-8'))
-            file = discord.File(fp=buffer, filename='edited_message.txt')
+        record.heading("Message's Info")
+        record.line('Message Author', f'{message.author.mention} ({discord.utils.escape_markdown(str(message.author))})', f'{message.author}')
+        record.line('Channel', message.channel.mention, f'#{message.channel}')
+        record.add(f'Created: {formatTime(message.created_at)}\n', f'Created (UTC): {formatTimeForFile(message.created_at)}\n')
+        record.line('Message ID', f'`{message.id}`', f'{message.id}')
+        record.line('Attachments', f'`{len(message.attachments)}`', f'{len(message.attachments)}')
+
+        record.heading("Message Content Before")
+        record.add('Unknown\n')
+
+        record.heading("Message Content After")
+        record.add(f'`{content_after}`\n', f'{message.clean_content}\n')
+        record.messageImage(message)
+
+        content, embed, file = record.render("**Message Edit!**", 'edited_message.txt')
 
         view = discord.ui.View()
         view.add_item(discord.ui.Button(label="Jump to message", url=message.jump_url))
 
-        await settingsCog.getMsgEditChannel(guild).send(content=content, embed=embed, file=file, view=view)
+        await self.bot.services.log_buffer.send(settingsCog.getMsgEditChannel(guild), content=content, embed=embed, file=file, view=view)
 
-    async def handleDelete(self, message: discord.Message):
+    async def handleDelete(self, message: MessageView):
 
-        # MY AUDIT LOG CHECKING METHOD THING
-        author = message.author
-        channel = message.channel
-        time = discord.utils.utcnow()
-
-        # self.bot.delete_log_cache is a map of audit log id to COUNT OF DELETED MESSAGEs
         message_deleter = "`Self or a Bot`"
         message_deleter_for_file = "Self or a Bot"
         _self = True
-        async for entry in message.guild.audit_logs(limit=10, action=discord.AuditLogAction.message_delete):
-            entry_id = entry.id
-            entry_deleter = entry.user
-            entry_victim = entry.target  # member that had message deleted
-            entry_channel = entry.extra.channel
-            entry_count = entry.extra.count
-            entry_created = entry.created_at
-
-            if author == entry_victim and channel == entry_channel and time - entry_created < timedelta(seconds=1):
-                # If same author channel AND created within last seconds, we have 100% found deleter.
-                # This is when a human moderator deletes another human or bots message
-                self.bot.delete_log_cache[entry_id] = entry_count  # Cache it
-                message_deleter = f"{entry_deleter.mention} ({discord.utils.escape_markdown(str(entry_deleter))})"
-                message_deleter_for_file = f"{entry_deleter}"
-                _self = False
-                break
-
-            # Now we must analyse stacked deletions
-            if entry_id not in self.bot.delete_log_cache:
-                # Cache all deleted message logs and numbers
-                self.bot.delete_log_cache[entry_id] = entry_count
-            else:
-                # Pull cached val
-                cached_count = self.bot.delete_log_cache[entry_id]
-                # print(f"Cache: {self.bot.delete_log_cache}")
-                # print(f"Entry count: {entry_count}")
-                # print(f"Cached count: {cached_count}")
-                # print(f"Author: {entry_victim}")
-
-                if entry_count > cached_count and author == entry_victim and channel == entry_channel:
-                    # If count has gone up AND correct author/channel, we have 100% found deleter.
-                    self.bot.delete_log_cache[entry_id] = entry_count  # update cache
-                    message_deleter = f"{entry_deleter.mention} ({discord.utils.escape_markdown(str(entry_deleter))})"
-                    message_deleter_for_file = f"{entry_deleter}"
-                    _self = False
-                    break
-            # otherwise message deleted by self or a bot
-
-        settingsCog = self.bot.get_cog("SettingsCommand")
+
+        deleter = await self.bot.services.delete_correlator.resolve(message.guild, message.channel.id, message.author.id)
+        if deleter is not None:
+            message_deleter = f"{deleter.mention} ({discord.utils.escape_markdown(str(deleter))})"
+            message_deleter_for_file = f"{deleter}"
+            _self = False
+
+        settingsCog = self.bot.services.settings
         if _self and message.author.bot and not settingsCog.isLogBotActionsEnabled(message.guild):
             return
 
-        embed = discord.Embed()
-        embed.set_author(name="Message Deleted", icon_url=message.author.display_avatar.url)
-        embed.colour = discord.Colour(0x2F3136)
+        record = LogRecord("Message Deleted", icon_url=message.author.display_avatar.url)
 
         if message.content:
-            content = message.clean_content.replace("`", "")  # remove so no messed up format
+            content = message.escaped_content  # backticks removed so no messed up format
         else:
             content = "None"
             if message.embeds:
@@ -202,88 +127,43 @@ class AuditLogCog(commands.Cog):
                     content += f"\n{embed_.footer.text or ''}"
                     content = content.replace("`", "")
 
-        embedDescription = f'**Message\'s Info:**\n' \
-                           f'Message Author: {message.author.mention} ({message.author})\n' \
-                           f'Deleted By: {message_deleter}\n' \
-                           f'Channel: {message.channel.mention}\n' \
-                           f'Created: {discord.utils.format_dt(message.created_at, "F")} ({discord.utils.format_dt(message.created_at, "R")})\n' \
-                           f'Message ID: `{message.id}`\n' \
-                           f'Attachments: `{len(message.attachments)}`\n' \
-                           f'Stickers: `{len(message.stickers)}`' \
-                           f'\n\n**Message Content:**\n`{content}`'
-
-        if len(message.attachments) != 0:
-            attachement1 = message.attachments[0]
-            if attachement1 and attachement1.content_type and attachement1.content_type.startswith("image"):
-                embed.set_image(url=attachement1.url)
-                embedDescription += f"\n\n**Message Image:**"
-
-        embed.description = embedDescription
-
-        file = None
-        content = None
-        if len(embed.description) > 4096 or len(embed) > 6000:
-            # attach as a file
-            embed = None
-            content = "**Message Delete!**"
-            fileContent = \
-                f'Message Author: {message.author}\n' \
-                f'Deleted By: {message_deleter_for_file}\n' \
-                f'Channel: #{message.channel}\n' \
-                f'Created (UTC): {message.created_at.strftime("%Y-%m-%d %H:%M-%S")}\n' \
-                f'Message ID: {message.id}\n' \
-                f'Attachments: {len(message.attachments)}\n' \
-                f'Stickers: {len(message.stickers)}' \
-                f'\n\nMessage Content:\n{message.clean_content}'
-
-            buffer = BytesIO(fileContent.encode('utf-8'))
-            file = discord.File(fp=buffer, filename='deleted_message.txt')
+        record.heading("Message's Info")
+        record.line('Message Author', f'{message.author.mention} ({message.author})', f'{message.author}')
+        record.line('Deleted By', message_deleter, message_deleter_for_file)
+        record.line('Channel', message.channel.mention, f'#{message.channel}')
+        record.add(f'Created: {formatTime(message.created_at)}\n', f'Created (UTC): {formatTimeForFile(message.created_at)}\n')
+        record.line('Message ID', f'`{message.id}`', f'{message.id}')
+        record.line('Attachments', f'`{len(message.attachments)}`', f'{len(message.attachments)}')
+        record.line('Stickers', f'`{len(message.stickers)}`', f'{len(message.stickers)}')
+
+        record.heading("Message Content")
+        record.add(f'`{content}`\n', f'{message.clean_content}\n')
+        record.messageImage(message)
+
+        content, embed, file = record.render("**Message Delete!**", 'deleted_message.txt')
 
         if _self:
             channel: discord.TextChannel = settingsCog.getMsgDeleteChannel(message.guild)
             if channel:
-                await channel.send(content=content, embed=embed, file=file)
+                await self.bot.services.log_buffer.send(channel, content=content, embed=embed, file=file)
         else:
             channel: discord.TextChannel = settingsCog.getModMsgDeleteChannel(message.guild)
             if channel:
-                await channel.send(content=content, embed=embed, file=file)
+                await self.bot.services.log_buffer.send(channel, content=content, embed=embed, file=file)
 
     async def handleRawDelete(self, payload: discord.RawMessageDeleteEvent, guild: discord.Guild):  # DONE
         """ Message is unknown"""
 
-        # MY AUDIT LOG CHECKING METHOD THING
         channel = guild.get_channel(payload.channel_id)
-        time = discord.utils.utcnow()
 
         message_deleter = "`Self or a Bot`"
         _self = True
-        async for entry in guild.audit_logs(limit=10, action=discord.AuditLogAction.message_delete):
-            entry_id = entry.id
-            entry_deleter = entry.user
-            entry_channel = entry.extra.channel
-            entry_count = entry.extra.count
-            entry_created = entry.created_at
-
-            if channel == entry_channel and time - entry_created < timedelta(seconds=1):
-                self.bot.delete_log_cache[entry_id] = entry_count  # Cache it
-                message_deleter = f"{entry_deleter.mention} ({discord.utils.escape_markdown(str(entry_deleter))})"
-                _self = False
-                break
-
-            # Now we must analyse stacked deletions
-            if entry_id not in self.bot.delete_log_cache:
-                # Cache all deleted message logs and numbers
-                self.bot.delete_log_cache[entry_id] = entry_count
-            else:
-                # Pull cached val
-                cached_count = self.bot.delete_log_cache[entry_id]
 
-                if entry_count > cached_count and channel == entry_channel:
-                    self.bot.delete_log_cache[entry_id] = entry_count  # update cache
-                    message_deleter = f"{entry_deleter.mention} ({discord.utils.escape_markdown(str(entry_deleter))})"
-                    _self = False
-                    break
-            # otherwise message deleted by self or a bot
+        # the author isn't known, so any deletion in the channel can match
+        deleter = await self.bot.services.delete_correlator.resolve(guild, payload.channel_id, None)
+        if deleter is not None:
+            message_deleter = f"{deleter.mention} ({discord.utils.escape_markdown(str(deleter))})"
+            _self = False
 
         # NO WAY TO GET AUTHOR. so idk if bot. so cant return here
 
@@ -296,388 +176,274 @@ class AuditLogCog(commands.Cog):
                             f'Message ID: `{payload.message_id}`\n' \
                             f'No other information available, sorry.'
 
-        settingsCog = self.bot.get_cog("SettingsCommand")
+        settingsCog = self.bot.services.settings
         if _self:
             channel: discord.TextChannel = settingsCog.getMsgDeleteChannel(guild)
             if channel:
-                await channel.send(embed=embed)
+                await self.bot.services.log_buffer.send(channel, embed=embed)
         else:
             channel: discord.TextChannel = settingsCog.getModMsgDeleteChannel(guild)
             if channel:
-                await channel.send(embed=embed)
+                await self.bot.services.log_buffer.send(channel, embed=embed)
 
     async def handleRawBulkDelete(self, payload: discord.RawBulkMessageDeleteEvent, guild: discord.Guild):  # DONE
         """ Some messages can be unknown """
         num_deleted = len(payload.message_ids)
 
-        async for entry in guild.audit_logs(limit=1, action=discord.AuditLogAction.message_bulk_delete):
-            # if payload.channel_id == entry.target.id:
+        entry = await self.bot.services.audit_cache.findEntry(guild, discord.AuditLogAction.message_bulk_delete, payload.channel_id,
+                                                              lambda entry: entry.extra.count == num_deleted)
+        if entry is not None:
             deleter = entry.user
             channel = entry.target
 
-            # Sort messages
-            _id = []
-            created_at = []
-            for msg in payload.cached_messages:
-                _id.append(msg.id)
-                created_at.append(msg.created_at)
-
-            if len(_id) >= 1:
-                data_sort = [list(a) for a in zip(_id, created_at)]
-                list4 = sorted(data_sort, key=lambda x: x[1], reverse=True)
-                _id, created_at = map(list, zip(*list4))
-
-            # These are for the FILE
-            cached_content = ""
-            non_cached_content = ""
-
-            # This are for the EMBED
-            embed_cached_content = ""
-            embed_non_cached_content = ""
-
-            for msg_id in _id:
-                cached_content += f"- Message ID {msg_id}:\n"
-                embed_cached_content += f"__Message ID {msg_id}__\n"
-                for cached_msg in payload.cached_messages:
-                    if cached_msg.id == msg_id:
-                        cached_content += f"  Author: {cached_msg.author}\n"
-                        cached_content += f"  Created (UTC): {cached_msg.created_at.strftime('%Y-%m-%d %H:%M-%S')}\n"  # year-month-day hour:min:sec
-                        cached_content += f"  Content: {cached_msg.clean_content}\n\n"
-
-                        embed_cached_content += f"Author: {cached_msg.author.mention} ({cached_msg.author})\n"
-                        embed_cached_content += f"Created: {discord.utils.format_dt(cached_msg.created_at)}\n"
-
-                        if cached_msg.content:
-                            embed_cached_content += f"Content: `{cached_msg.clean_content.replace('`', '')}`\n\n"
-                        else:
-                            embed_cached_content += f"Content: `None`\n\n"
-
-                        break
-
-            for msg_id in payload.message_ids:
-                if msg_id not in _id:  # it is not cached
-                    non_cached_content += f"- Message ID {msg_id}:\n"
-                    non_cached_content += f"  Message not in cache\n\n"
-
-                    embed_non_cached_content += f"__Message ID {msg_id}__\n"
-                    embed_non_cached_content += f"Message not in cache\n\n"
-
-            embed = discord.Embed(timestamp=discord.utils.utcnow())
-            embed.set_author(name="Bulk Message Delete", icon_url=deleter.display_avatar.url)
-            embed.colour = discord.Colour(0x2F3136)
-
-            embed.description = f'{num_deleted} messages deleted by {deleter.mention} ({deleter}) in {channel.mention}' \
-                                f'\n\n**Messages:**\n\n' \
-                                f'{f"{embed_cached_content}{embed_non_cached_content}"}'
-
-            file = None
-            content = None
-            if len(embed.description) > 4096 or len(embed) > 6000:
-                # attach as a file
-                embed = None
-                content = "**Bulk Message Delete!**"
-                fileContent = f"{num_deleted} messages deleted in #{channel} by {deleter}:\n\n{cached_content}{non_cached_content}"
-
-                buffer = BytesIO(fileContent.encode('utf-8'))
-                file = discord.File(fp=buffer, filename='deleted_messages.txt')
-
-            settingsCog = self.bot.get_cog("SettingsCommand")
-            await settingsCog.getModMsgDeleteChannel(guild).send(content=content, embed=embed, file=file)
+            # message id to the cached message, newest first
+            cached_messages = {msg.id: msg for msg in sorted(payload.cached_messages, key=lambda msg: msg.created_at, reverse=True)}
 
-    async def handleNickUpdate(self, before: discord.Member, after: discord.Member):
+            record = LogRecord("Bulk Message Delete", icon_url=deleter.display_avatar.url, timestamp=discord.utils.utcnow())
+            record.add(f'{num_deleted} messages deleted by {deleter.mention} ({deleter}) in {channel.mention}\n',
+                       f'{num_deleted} messages deleted in #{channel} by {deleter}:\n')
+            record.add('\n**Messages:**\n\n', '\n')
 
-        async for entry in after.guild.audit_logs(limit=1, action=discord.AuditLogAction.member_update):
-            # // NickBefore = discord.utils.escape_markdown()
-            # //NickAfter = discord.utils.escape_markdown()
+            for msg_id, cached_msg in cached_messages.items():
+                clean_content = cached_msg.clean_content
+                if cached_msg.content:
+                    embed_content = f"`{clean_content.replace('`', '')}`"
+                else:
+                    embed_content = "`None`"
 
-            settingsCog = self.bot.get_cog("SettingsCommand")
-            if entry.user.bot and not settingsCog.isLogBotActionsEnabled(after.guild):
-                return
+                record.add(f"__Message ID {msg_id}__\n"
+                           f"Author: {cached_msg.author.mention} ({cached_msg.author})\n"
+                           f"Created: {discord.utils.format_dt(cached_msg.created_at)}\n"
+                           f"Content: {embed_content}\n\n",
+                           f"- Message ID {msg_id}:\n"
+                           f"  Author: {cached_msg.author}\n"
+                           f"  Created (UTC): {formatTimeForFile(cached_msg.created_at)}\n"
+                           f"  Content: {clean_content}\n\n")
 
-            embed = discord.Embed()
-            embed.set_author(name="Nickname Update", icon_url=after.display_avatar.url)
-            embed.colour = discord.Colour(0x2F3136)
+            for msg_id in sorted(payload.message_ids, reverse=True):  # ids go up over time, so also newest first
+                if msg_id not in cached_messages:  # it is not cached
+                    record.add(f"__Message ID {msg_id}__\n"
+                               f"Message not in cache\n\n",
+                               f"- Message ID {msg_id}:\n"
+                               f"  Message not in cache\n\n")
 
-            if entry.user == after:
-                changed_by = "`Self`"
-            else:
-                changed_by = f"{entry.user.mention}  ({discord.utils.escape_markdown(str(entry.user))})"
+            content, embed, file = record.render("**Bulk Message Delete!**", 'deleted_messages.txt')
 
-            embed.description = f"**Member:** {after.mention}  ({discord.utils.escape_markdown(str(after))})\n" \
-                                f"**Nickname Before:** `{before.display_name}`\n" \
-                                f"**Nickname After:** `{after.display_name}`\n" \
-                                f"**Changed By:** {changed_by}\n"
+            settingsCog = self.bot.services.settings
+            await self.bot.services.log_buffer.send(settingsCog.getModMsgDeleteChannel(guild), content=content, embed=embed, file=file)
 
-            await settingsCog.getNickUpdateChannel(after.guild).send(embed=embed)
+    async def findMemberUpdater(self, after: discord.Member, attribute: str, value):
+        """ Returns who changed a member's nick or timeout, from the member update entry for this member and this change """
+        def check(entry: discord.AuditLogEntry) -> bool:
+            return getattr(entry.after, attribute, discord.utils.MISSING) == value
 
-    async def handleTimeout(self, before: discord.Member, after: discord.Member):
+        return await self.bot.services.audit_cache.findEntry(after.guild, discord.AuditLogAction.member_update, after.id, check)
 
-        async for entry in after.guild.audit_logs(limit=1, action=discord.AuditLogAction.member_update):
+    async def handleNickUpdate(self, before: discord.Member, after: discord.Member):
 
-            settingsCog = self.bot.get_cog("SettingsCommand")
-            if entry.user.bot and not settingsCog.isLogBotActionsEnabled(after.guild):
-                return
+        entry = await self.findMemberUpdater(after, 'nick', after.nick)
 
-            embed = discord.Embed()
-            embed.colour = discord.Colour(0x2F3136)
+        settingsCog = self.bot.services.settings
+        if entry is not None and entry.user.bot and not settingsCog.isLogBotActionsEnabled(after.guild):
+            return
 
-            if before.is_timed_out() and not after.is_timed_out():
-                """ This is only triggered when a moderator manually removes a timeout. NOT when a timeout expires. """
+        embed = discord.Embed()
+        embed.set_author(name="Nickname Update", icon_url=after.display_avatar.url)
+        embed.colour = discord.Colour(0x2F3136)
 
-                embed.set_author(name="Member Timeout Remove", icon_url=after.display_avatar.url)
+        if entry is None:
+            changed_by = "`Unknown`"
+        elif entry.user == after:
+            changed_by = "`Self`"
+        else:
+            changed_by = f"{entry.user.mention}  ({discord.utils.escape_markdown(str(entry.user))})"
 
-                if entry.user == after:
-                    timed_out_by = "`Self`"
-                else:
-                    timed_out_by = f"{entry.user.mention}  ({discord.utils.escape_markdown(str(entry.user))})"
+        embed.description = f"**Member:** {after.mention}  ({discord.utils.escape_markdown(str(after))})\n" \
+                            f"**Nickname Before:** `{before.display_name}`\n" \
+                            f"**Nickname After:** `{after.display_name}`\n" \
+                            f"**Changed By:** {changed_by}\n"
 
-                embed.description = f"**Member:** {after.mention}  ({discord.utils.escape_markdown(str(after))})\n" \
-                                    f"**Removed By:** {timed_out_by}\n"
+        await self.bot.services.log_buffer.send(settingsCog.getNickUpdateChannel(after.guild), embed=embed)
 
-            else:
-                embed.set_author(name="Member Timeout Add", icon_url=after.display_avatar.url)
-                embed.colour = discord.Colour(0x2F3136)
+    async def handleTimeout(self, before: discord.Member, after: discord.Member):
 
-                if entry.user == after:
-                    timed_out_by = "`Self`"
-                else:
-                    timed_out_by = f"{entry.user.mention}  ({discord.utils.escape_markdown(str(entry.user))})"
+        entry = await self.findMemberUpdater(after, 'timed_out_until', after.timed_out_until)
 
-                if entry.reason:
-                    reason = entry.reason.replace('`', '')
-                else:
-                    reason = "None"
+        settingsCog = self.bot.services.settings
+        if entry is not None and entry.user.bot and not settingsCog.isLogBotActionsEnabled(after.guild):
+            return
 
-                embed.description = f"**Member:** {after.mention}  ({discord.utils.escape_markdown(str(after))})\n" \
-                                    f"**Timed Out Until:** {discord.utils.format_dt(after.timed_out_until)}\n" \
-                                    f"**Reason:** `{reason}`\n" \
-                                    f"**Timed Out By:** {timed_out_by}\n"
+        embed = discord.Embed()
+        embed.colour = discord.Colour(0x2F3136)
 
-            await settingsCog.getMemberTimeoutChannel(after.guild).send(embed=embed)
+        if entry is None:
+            timed_out_by = "`Unknown`"
+        elif entry.user == after:
+            timed_out_by = "`Self`"
+        else:
+            timed_out_by = f"{entry.user.mention}  ({discord.utils.escape_markdown(str(entry.user))})"
 
-    async def handleRoleUpdate(self, before: discord.Member, after: discord.Member, roles_gained: list[discord.Role], roles_lost: list[discord.Role]):
+        if before.is_timed_out() and not after.is_timed_out():
+            """ This is only triggered when a moderator manually removes a timeout. NOT when a timeout expires. """
 
-        settingsCog = self.bot.get_cog("SettingsCommand")
+            embed.set_author(name="Member Timeout Remove", icon_url=after.display_avatar.url)
 
-        # parallel lists - store roles before, roles after and role user (give/remover) for the last 10 audit log entries
-        audit_log_roles_before = []
-        audit_log_roles_after = []
-        audit_log_user = []
+            embed.description = f"**Member:** {after.mention}  ({discord.utils.escape_markdown(str(after))})\n" \
+                                f"**Removed By:** {timed_out_by}\n"
 
-        async for entry in after.guild.audit_logs(limit=10, action=discord.AuditLogAction.member_role_update, oldest_first=False):
-            roles_before = entry.changes.before.roles
-            roles_after = entry.changes.after.roles
-            user = entry.user
+        else:
+            embed.set_author(name="Member Timeout Add", icon_url=after.display_avatar.url)
 
-            audit_log_roles_before.append(roles_before)
-            audit_log_roles_after.append(roles_after)
-            audit_log_user.append(user)
+            if entry is not None and entry.reason:
+                reason = entry.reason.replace('`', '')
+            else:
+                reason = "None"
 
-        # print(audit_log_roles_before)
-        # print(audit_log_roles_after)
-        # print(audit_log_user)
+            embed.description = f"**Member:** {after.mention}  ({discord.utils.escape_markdown(str(after))})\n" \
+                                f"**Timed Out Until:** {discord.utils.format_dt(after.timed_out_until)}\n" \
+                                f"**Reason:** `{reason}`\n" \
+                                f"**Timed Out By:** {timed_out_by}\n"
+
+        await self.bot.services.log_buffer.send(settingsCog.getMemberTimeoutChannel(after.guild), embed=embed)
+
+    async def findRoleUpdater(self, member: discord.Member, gained_ids: frozenset[int], lost_ids: frozenset[int]):
+        """ Returns who made a role change, from the audit log entry for this member and this exact change """
+        def check(entry: discord.AuditLogEntry) -> bool:
+            return (frozenset(role.id for role in entry.before.roles) == lost_ids
+                    and frozenset(role.id for role in entry.after.roles) == gained_ids)
+
+        entry = await self.bot.services.audit_cache.findEntry(member.guild, discord.AuditLogAction.member_role_update, member.id, check)
+        return entry.user if entry is not None else None
+
+    @staticmethod
+    def isAutomaticRole(role: discord.Role) -> bool:
+        """ Roles given by discord or an integration, which have no audit log entry saying who gave them """
+        return (role.is_premium_subscriber() or role.is_bot_managed() or role.is_integration()
+                or role.id in (803221531546615840, 786670642769821767))
+
+    @staticmethod
+    def liveRoles(guild: discord.Guild, role_ids: frozenset[int]) -> list[discord.Role]:
+        """ Members losing a role because it was deleted are listed in the role delete log instead, so deleted roles are left out """
+        return sorted(role for role in map(guild.get_role, role_ids) if role is not None)
+
+    def addRoleChanges(self, record: LogRecord, guild: discord.Guild, roles_gained: list[discord.Role], roles_lost: list[discord.Role], actor) -> bool:
+        """ Adds the gained and lost roles to a log. Returns False if there was nothing to log """
+        log_bot_actions: bool = self.bot.services.settings.isLogBotActionsEnabled(guild)
+
+        if actor is None:
+            changed_by, changed_by_for_file = "Unknown", "Unknown"
+        elif actor.bot and not log_bot_actions:
+            changed_by, changed_by_for_file = None, None  # dont log this as bot.
+        else:
+            changed_by, changed_by_for_file = f"{actor.mention} ({discord.utils.escape_markdown(str(actor))})", f"{actor}"
+
+        logged = False
+        for roles, title, icon, verb in ((roles_gained, "Gained", "<:tick:873224615881748523>", "Given"),
+                                         (roles_lost, "Lost", "<:cross:872834807476924506>", "Removed")):
+            on_first_role: bool = True
+            for role in roles:
+
+                if role.is_premium_subscriber() or role.is_bot_managed() or role.id == 803221531546615840:
+                    by, by_for_file = "Discord", "Discord"
+                elif role.is_integration() or role.id == 786670642769821767:
+                    by, by_for_file = "An Integration", "An Integration"
+                    # Integrations are basically bots
+                    if not log_bot_actions:
+                        continue
+                elif changed_by is None:
+                    continue  # move onto next role - dont log this as bot.
+                else:
+                    by, by_for_file = changed_by, changed_by_for_file
 
-        log_bot_actions: bool = settingsCog.isLogBotActionsEnabled(after.guild)
+                if on_first_role:
+                    suffix = "s"
+                    if len(roles) == 1:
+                        suffix = ""
+                    record.add(f"**Role{suffix} {title} ({len(roles)}):**\n", f"Role{suffix} {title} ({len(roles)}):\n")
 
-        change_list = ""
+                on_first_role = False
+                logged = True
 
-        on_first_role: bool = True
-        for role in roles_gained:
+                record.add(f"{icon} {role.mention} (Name: {role.name}) | {verb} by {by}\n", f" - {role.name} ({role.id}) | {verb} by {by_for_file}\n")
 
-            if role.is_premium_subscriber() or role.is_bot_managed() or role.id == 803221531546615840:
-                given_by = "Discord"
-            elif role.is_integration() or role.id == 786670642769821767:
-                given_by = "An Integration"
-                # Integrations are basically bots
-                if not log_bot_actions:
-                    continue
-            else:
+        return logged
 
-                given_by = None
-                # print(f"finding who gave role: {role.name}")
-                # loop through audit log
-                for item in range(len(audit_log_user)):
-                    roles_before = audit_log_roles_before[item]
-                    roles_after = audit_log_roles_after[item]
-                    user = audit_log_user[item]
-
-                    # print(roles_before)
-                    # print(roles_after)
-                    # print(user)
-                    #
-                    # print(roles_lost)
-                    # print(roles_gained)
-
-                    # Check before and after equal
-                    passed_before = True
-                    if len(roles_after) == len(roles_gained):
-                        roles_gained_id = [__item.id for __item in roles_gained]
-
-                        for _item in roles_after:
-                            if _item.id not in roles_gained_id:
-                                passed_before = False
-                    else:
-                        passed_before = False
-
-                    passed_after = True
-                    if len(roles_before) == len(roles_lost):
-                        roles_lost_id = [__item.id for __item in roles_lost]
-
-                        for _item in roles_before:
-                            if _item.id not in roles_lost_id:
-                                passed_after = False
-                    else:
-                        passed_after = False
-
-                    if passed_before and passed_after:
-                        given_by = user
-                        break
-
-                if given_by:
-                    if given_by.bot and not log_bot_actions:
-                        # print("Moving onto next role as dont log bot actions")
-                        continue  # move onto next role - dont log this as bot.
-                    else:
-                        given_by = f"{given_by.mention} ({discord.utils.escape_markdown(str(given_by))})"
-                else:
-                    given_by = "Unknown"
+    async def handleRoleUpdate(self, member: discord.Member, gained_ids: frozenset[int], lost_ids: frozenset[int]):
+        roles_gained, roles_lost = self.liveRoles(member.guild, gained_ids), self.liveRoles(member.guild, lost_ids)
+        if not roles_gained and not roles_lost:
+            return  # only deleted roles were lost, so there is no need to look up who did it
 
-            if on_first_role:
-                suffix = "s"
-                if len(roles_gained) == 1:
-                    suffix = ""
-                change_list += (f"**Role{suffix} Gained ({len(roles_gained)}):**\n")
+        if all(map(self.isAutomaticRole, roles_gained + roles_lost)):
+            actor = None  # the roles show who changed them
+        else:
+            actor = await self.findRoleUpdater(member, gained_ids, lost_ids)
 
-            on_first_role = False
+        record = LogRecord("Role Update", icon_url=member.display_avatar.url)
+        record.add(f"**Member:** {member.mention}  ({discord.utils.escape_markdown(str(member))})\n", f"Member: {member} ({member.id})\n")
+        if not self.addRoleChanges(record, member.guild, roles_gained, roles_lost, actor):
+            return
 
-            change_list += (f"<:tick:873224615881748523> {role.mention} (Name: {role.name}) | Given by {given_by}\n")
+        content, embed, file = record.render("**Role Update!**", 'role_update.txt')
 
-        on_first_role: bool = True
-        for role in roles_lost:
+        settingsCog = self.bot.services.settings
+        await self.bot.services.log_buffer.send(settingsCog.getRoleUpdateChannel(member.guild), content=content, embed=embed, file=file)
 
-            if role.is_premium_subscriber() or role.is_bot_managed() or role.id == 803221531546615840:
-                removed_by = "Discord"
-            elif role.is_integration() or role.id == 786670642769821767:
-                removed_by = "An Integration"
-                # Integrations are basically bots
-                if not log_bot_actions:
-                    continue
-            else:
+    async def handleRoleUpdateBurst(self, members: list[discord.Member], gained_ids: frozenset[int], lost_ids: frozenset[int]):
+        """ Logs the same role change made to many members at once as one summary, with the members listed in a file """
+        guild = members[0].guild
+        roles_gained, roles_lost = self.liveRoles(guild, gained_ids), self.liveRoles(guild, lost_ids)
+        if not roles_gained and not roles_lost:
+            return  # only deleted roles were lost, so there is no need to look up who did it
 
-                removed_by = None
-                # print(f"finding who removed role: {role.name}")
-
-                # loop through audit log
-                for item in range(len(audit_log_user)):
-                    roles_before = audit_log_roles_before[item]
-                    roles_after = audit_log_roles_after[item]
-                    user = audit_log_user[item]
-
-                    # print(roles_before)
-                    # print(roles_after)
-                    # print(user)
-
-                    # Check before and after equal
-                    passed_before = True
-                    if len(roles_after) == len(roles_gained):
-                        roles_gained_id = [__item.id for __item in roles_gained]
-
-                        for _item in roles_after:
-                            if _item.id not in roles_gained_id:
-                                passed_before = False
-                    else:
-                        passed_before = False
-
-                    passed_after = True
-                    if len(roles_before) == len(roles_lost):
-                        roles_lost_id = [__item.id for __item in roles_lost]
-
-                        for _item in roles_before:
-                            if _item.id not in roles_lost_id:
-                                passed_after = False
-                    else:
-                        passed_after = False
-
-                    if passed_before and passed_after:
-                        # if roles_after == roles_gained and roles_before == roles_lost:
-                        removed_by = user
-                        break
-
-                if removed_by:
-                    if removed_by.bot and not log_bot_actions:
-                        # print("Moving onto next role as dont log bot actions")
-                        continue  # move onto next role - dont log this as bot.
-                    else:
-                        removed_by = f"{removed_by.mention} ({discord.utils.escape_markdown(str(removed_by))})"
-                else:
-                    removed_by = "Unknown"
+        if all(map(self.isAutomaticRole, roles_gained + roles_lost)):
+            actor = None  # the roles show who changed them
+        else:
+            actor = await self.findRoleUpdater(members[-1], gained_ids, lost_ids)  # the last member changed has the newest entry
+
+        record = LogRecord("Mass Role Update", icon_url=actor.display_avatar.url if actor else None, timestamp=discord.utils.utcnow())
+        record.add(f"**{len(members)} members** had the same roles changed.\n", f"{len(members)} members had the same roles changed.\n")
+        if not self.addRoleChanges(record, guild, roles_gained, roles_lost, actor):
+            return
 
-            if on_first_role:
-                suffix = "s"
-                if len(roles_lost) == 1:
-                    suffix = ""
-                change_list += (f"**Role{suffix} Lost ({len(roles_lost)}):**\n")
+        record.add(f"\n**Members ({len(members)}):** listed in the attached file\n", f"\nMembers ({len(members)}):\n")
+        for member in members:
+            record.add('', f" - {member} ({member.id})\n")  # only listed in the file
 
-            on_first_role = False
+        # the summary is always attached as a file so every member can be read
+        if record.fits():
+            content, embed = None, record.toEmbed()
+        else:
+            content, embed = "**Mass Role Update!**", None
+        file = record.toFile('mass_role_update.txt')
 
-            change_list += (f"<:cross:872834807476924506> {role.mention} (Name: {role.name}) | Removed by {removed_by}\n")
+        settingsCog = self.bot.services.settings
+        await self.bot.services.log_buffer.send(settingsCog.getRoleUpdateChannel(guild), content=content, embed=embed, file=file)
 
-        if change_list == "":
+    async def handleRoleDelete(self, role: discord.Role, members: list[discord.Member]):
+        try:
+            entry = await self.bot.services.audit_cache.findEntry(role.guild, discord.AuditLogAction.role_delete, role.id)
+        except discord.Forbidden:
             return
 
-        embed = discord.Embed()
-        embed.set_author(name="Role Update", icon_url=after.display_avatar.url)
-        embed.colour = discord.Colour(0x2F3136)
+        if entry is None:
+            return
 
-        embed.description = f"**Member:** {after.mention}  ({discord.utils.escape_markdown(str(after))})\n" \
-                            f"{change_list}"
+        deleter = entry.user
 
-        await settingsCog.getRoleUpdateChannel(after.guild).send(embed=embed)
+        # a role getting deleted is significant enough to get logged - even if deleted by a bot
 
-    async def handleRoleDelete(self, role: discord.Role):
-        self.bot.delete_role_cache[str(role.id)] = []
-        await asyncio.sleep(2)
+        record = LogRecord("Role Delete", icon_url=deleter.display_avatar.url)
+        record.add(f"Role **{role.name}** was deleted by {deleter.mention} ({discord.utils.escape_markdown(str(deleter))}).\n",
+                   f"Role {role.name} was deleted by {deleter}.\n")
 
-        try:
+        record.heading(f"Members That Lost Role ({len(members)})")
+        for member in members:
+            record.add(f" - {member.mention} ({discord.utils.escape_markdown(str(member))})\n", f" - {member}\n")
 
-            async for entry in role.guild.audit_logs(limit=3, action=discord.AuditLogAction.role_delete, oldest_first=False):
-                if entry.target.id == role.id:
-                    deleter = entry.user
-
-                    # a role getting deleted is significant enough to get logged - even if deleted by a bot
-
-                    members = self.bot.delete_role_cache[str(role.id)]
-
-                    embed = discord.Embed()
-                    embed.set_author(name="Role Delete", icon_url=deleter.display_avatar.url)
-                    embed.colour = discord.Colour(0x2F3136)
-
-                    msg = ""
-                    file_msg = ""
-                    for mem in members:
-                        mem_A = await self.bot.get_or_fetch_member(role.guild, mem)
-                        msg += f" - {mem_A.mention} ({discord.utils.escape_markdown(str(mem_A))})\n"
-                        file_msg += f" - {mem_A}\n"
-                    embed.description = f"Role **{role.name}** was deleted by {deleter.mention} ({discord.utils.escape_markdown(str(deleter))}).\n\n" \
-                                        f"**Members That Lost Role ({len(members)}):**\n{msg}"
-
-                    file = None
-                    content = None
-                    if len(embed.description) > 4096 or len(embed) > 6000:
-                        # attach as a file
-                        embed = None
-                        content = "**Role Delete!**"
-                        fileContent = f"Role {role.name} was deleted by {deleter}.\n\n" \
-                                      f"Members That Lost Role ({len(members)}):\n{file_msg}"
-                        buffer = BytesIO(fileContent.encode('utf-8'))
-                        file = discord.File(fp=buffer, filename='role_delete.txt')
-
-                    settingsCog = self.bot.get_cog("SettingsCommand")
-                    await settingsCog.getRoleUpdateChannel(role.guild).send(content=content, embed=embed, file=file)
-                    return
+        content, embed, file = record.render("**Role Delete!**", 'role_delete.txt')
 
-        except discord.Forbidden:
-            pass
+        settingsCog = self.bot.services.settings
+        await self.bot.services.log_buffer.send(settingsCog.getRoleUpdateChannel(role.guild), content=content, embed=embed, file=file)
 
 
 async def setup(bot):
@@ -1,154 +1,160 @@
 import logging
-from datetime import timedelta
-from io import BytesIO
+from collections import deque
 
 import discord
 from discord.ext import commands
 
+from cogs._events.message import MessageView
+from cogs.modules.logrender import LogRecord, formatTime, formatTimeForFile
+
 log = logging.getLogger(__name__)
 
 
+class WordMatcher:
+    """ An Aho-Corasick automaton built from a guild's chat filter.
+    Finds whether any filtered word is in a message with a single pass over the message. """
+
+    __slots__ = ('_goto', '_fail', '_out')
+
+    def __init__(self, words: list[str]) -> None:
+        goto: list[dict[str, int]] = [{}]
+        out: list[bool] = [False]
+
+        # Build the trie of all words
+        for word in words:
+            state = 0
+            for ch in word:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    out.append(False)
+                state = next_state
+            out[state] = True  # an empty word marks the root, so it matches everything like `"" in content` does
+
+        # Breadth first pass to link each state to its longest proper suffix
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[next_state] = goto[f].get(ch, 0)
+                out[next_state] = out[next_state] or out[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def search(self, content: str) -> bool:
+        """ Returns True if any word is found in the content """
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+
+        if out[0]:
+            return True
+
+        state = 0
+        for ch in content:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                return True
+        return False
+
+
 class ChatFilterCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-
-    async def handleChat(self, message: discord.Message) -> bool:
-        content_lower = message.content.lower()
-
-        settingsCog = self.bot.get_cog("SettingsCommand")
-
-        chat_filter = settingsCog.getChatFilter(message.guild)
-
-        delete = False
-        for word in chat_filter:
-            if word in content_lower:
-                delete = True
-                break
-
-        if delete:
-            try:
-                await message.delete()
-            except discord.NotFound:  # another bot deleted it
-                pass
-            try:
-                await message.author.timeout(timedelta(seconds=3))
-            except discord.Forbidden as e:  # no permission
-                pass
-            # log it
-            modLogChannel = settingsCog.getModLogChannel(message.guild)
-            if modLogChannel:
-
-                embed = discord.Embed()
-                embed.set_author(name="Chat Filter", icon_url=message.author.display_avatar.url)
-                embed.colour = discord.Colour(0x2F3136)
-                embedDescription = f'{message.author.mention} ({message.author}) tried to send a message with filtered words.\n\n'
-
-                msg_content = message.clean_content.replace("`", "")
-
-                embedDescription += f'**Message\'s Info:**\n' \
-                                    f'Message ID: `{message.id}`\n' \
-                                    f'Channel: {message.channel.mention}\n' \
-                                    f'Time: {discord.utils.format_dt(message.created_at, "F")} ({discord.utils.format_dt(message.created_at, "R")})\n' \
-                                    f'Attachments: `{len(message.attachments)}`'
-                embedDescription += f'\n\n**Message Content:**\n`{msg_content}`'
-
-                if len(message.attachments) != 0:
-                    attachement1 = message.attachments[0]
-                    if attachement1.content_type.startswith("image"):
-                        embed.set_image(url=attachement1.url)
-                        embedDescription += f"\n\n**Message Image:**"
-
-                embed.description = embedDescription
-
-                file = None
-                content = None
-                if len(embed.description) > 4096 or len(embed) > 6000:
-                    # attach as a file
-                    embed = None
-                    content = "**Chat Filter!**"
-                    fileContent = f'{message.author} tried to send a message with filtered words.\n\n' \
-                                  f'Message ID: {message.id}\n' \
-                                  f'Channel: #{message.channel}\n' \
-                                  f'Time (UTC): {message.created_at.strftime("%Y-%m-%d %H:%M-%S")}\n' \
-                                  f'Attachments: {len(message.attachments)}\n\n' \
-                                  f'Message Content:\n{message.clean_content}'
-                    buffer = BytesIO(fileContent.encode('utf-8'))
-                    file = discord.File(fp=buffer, filename='chat_filter.txt')
-
-                await modLogChannel.send(content=content, embed=embed, file=file)
-            return True
-        else:
-            return False
-
-    async def handleChatEdit(self, before, after) -> bool:
-        content_lower = after.content.lower()
-
-        settingsCog = self.bot.get_cog("SettingsCommand")
-
-        chat_filter = settingsCog.getChatFilter(after.guild)
-
-        delete = False
-        for word in chat_filter:
-            if word in content_lower:
-                delete = True
-                break
-
-        if delete:
-            try:
-                await after.delete()
-            except discord.NotFound:  # another bot deleted it
-                pass
-            try:
-                await after.author.timeout(timedelta(seconds=3))
-            except discord.Forbidden as e:  # no permission
-                pass
-            # log it
-            modLogChannel = settingsCog.getModLogChannel(after.guild)
-            if modLogChannel:
-                embed = discord.Embed()
-                embed.set_author(name="Chat Filter", icon_url=after.author.display_avatar.url)
-                embed.colour = discord.Colour(0x2F3136)
-                embedDescription = f'{after.author.mention} ({after.author}) tried to edit a filtered word into their message.\n\n'
-
-                embedDescription += f'**Message\'s Info:**\n' \
-                                    f'Message ID: `{after.id}`\n' \
-                                    f'Channel: {after.channel.mention}\n' \
-                                    f'Time: {discord.utils.format_dt(after.created_at, "F")} ({discord.utils.format_dt(after.created_at, "R")})\n' \
-                                    f'Attachments: `{len(after.attachments)}`'
-
-                content_before = before.clean_content.replace("`", "")
-                content_after = after.clean_content.replace("`", "")
-
-                embedDescription += f'\n\n**Message Before:**\n`{content_before}`'
-                embedDescription += f'\n\n**Message After:**\n`{content_after}`'
-
-                if len(after.attachments) != 0:
-                    attachement1 = after.attachments[0]
-                    if attachement1.content_type.startswith("image"):
-                        embed.set_image(url=attachement1.url)
-                        embedDescription += f"\n\n**Message Image:**"
-                embed.description = embedDescription
-
-                file = None
-                content = None
-                if len(embed.description) > 4096 or len(embed) > 6000:
-                    # attach as a file
-                    embed = None
-                    content = "**Chat Filter!**"
-                    fileContent = f'{after.author} tried to edit a filtered word into their message.\n\n' \
-                                  f'Message ID: {after.id}\n' \
-                                  f'Channel: #{after.channel}\n' \
-                                  f'Time (UTC): {after.created_at.strftime("%Y-%m-%d %H:%M-%S")}\n' \
-                                  f'Attachments: {len(after.attachments)}' \
-                                  f'\n\nMessage Content Before:\n{before.clean_content}' \
-                                  f'\n\nMessage Content After:\n{after.clean_content}'
-                    buffer = BytesIO(fileContent.encode('utf-8'))
-                    file = discord.File(fp=buffer, filename='chat_filter.txt')
-
-                await modLogChannel.send(content=content, embed=embed, file=file)
-            return True
-        else:
-            return False
+        self._matchers: dict[int, WordMatcher] = {}  # guild id to the compiled chat filter
+
+    async def cog_load(self) -> None:
+        self.bot.services.chat_filter = self
+
+    async def cog_unload(self) -> None:
+        self.bot.services.chat_filter = None
+
+    def getMatcher(self, guild: discord.Guild) -> WordMatcher:
+        """ Returns the compiled chat filter for a guild, building it if needed """
+        matcher = self._matchers.get(guild.id)
+        if matcher is None:
+            chat_filter = self.bot.services.settings.getChatFilter(guild)
+            matcher = WordMatcher(chat_filter)
+            self._matchers[guild.id] = matcher
+        return matcher
+
+    def invalidateMatcher(self, guild_id: int):
+        """ Called when a guild's chat filter is changed so it gets rebuilt on the next message """
+        self._matchers.pop(guild_id, None)
+
+    def clearMatchers(self):
+        self._matchers.clear()
+
+    async def handleChat(self, message: MessageView):
+        """ Deletes and logs a message which contains filtered words """
+        settingsCog = self.bot.services.settings
+
+        modQueue = self.bot.services.mod_queue
+        modQueue.queueDelete(message.message)
+        modQueue.queueTimeout(message.author)
+        # log it
+        modLogChannel = settingsCog.getModLogChannel(message.guild)
+        if modLogChannel:
+
+            record = LogRecord("Chat Filter", icon_url=message.author.display_avatar.url)
+            record.add(f'{message.author.mention} ({message.author}) tried to send a message with filtered words.\n',
+                       f'{message.author} tried to send a message with filtered words.\n')
+
+            record.heading("Message's Info")
+            record.line('Message ID', f'`{message.id}`', f'{message.id}')
+            record.line('Channel', message.channel.mention, f'#{message.channel}')
+            record.add(f'Time: {formatTime(message.created_at)}\n', f'Time (UTC): {formatTimeForFile(message.created_at)}\n')
+            record.line('Attachments', f'`{len(message.attachments)}`', f'{len(message.attachments)}')
+
+            record.heading("Message Content")
+            record.add(f'`{message.escaped_content}`\n', f'{message.clean_content}\n')
+            record.messageImage(message)
+
+            content, embed, file = record.render("**Chat Filter!**", 'chat_filter.txt')
+
+            modQueue.queueLog(modLogChannel, "Chat Filter", message, content=content, embed=embed, file=file)
+
+    async def handleChatEdit(self, before: MessageView, after: MessageView):
+        """ Deletes and logs a message which was edited to contain filtered words """
+        settingsCog = self.bot.services.settings
+
+        modQueue = self.bot.services.mod_queue
+        modQueue.queueDelete(after.message)
+        modQueue.queueTimeout(after.author)
+        # log it
+        modLogChannel = settingsCog.getModLogChannel(after.guild)
+        if modLogChannel:
+            record = LogRecord("Chat Filter", icon_url=after.author.display_avatar.url)
+            record.add(f'{after.author.mention} ({after.author}) tried to edit a filtered word into their message.\n',
+                       f'{after.author} tried to edit a filtered word into their message.\n')
+
+            record.heading("Message's Info")
+            record.line('Message ID', f'`{after.id}`', f'{after.id}')
+            record.line('Channel', after.channel.mention, f'#{after.channel}')
+            record.add(f'Time: {formatTime(after.created_at)}\n', f'Time (UTC): {formatTimeForFile(after.created_at)}\n')
+            record.line('Attachments', f'`{len(after.attachments)}`', f'{len(after.attachments)}')
+
+            record.heading("Message Before")
+            record.add(f'`{before.escaped_content}`\n', f'{before.clean_content}\n')
+
+            record.heading("Message After")
+            record.add(f'`{after.escaped_content}`\n', f'{after.clean_content}\n')
+            record.messageImage(after)
+
+            content, embed, file = record.render("**Chat Filter!**", 'chat_filter.txt')
+
+            modQueue.queueLog(modLogChannel, "Chat Filter", after, content=content, embed=embed, file=file)
 
 
 async def setup(bot):
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Optional, Union
+
+import discord
+from discord.ext import commands, tasks
+
+from cogs.commands.settings import DEFAULT_SETTINGS, Feature
+
+log = logging.getLogger(__name__)
+
+BATCH_DELAY = 0.5  # seconds deletions are collected for before the audit log is fetched
+CREDIT_TTL = 10.0  # seconds a deletion counted in the audit log waits for its delete event
+DELETE_LOGS = int(Feature.MSG_DELETE_LOG | Feature.MOD_MSG_DELETE_LOG)  # the logs which need to know who deleted a message
+NEW_ENTRY_WINDOW = timedelta(seconds=10)  # an entry seen for the first time only counts if it was created this recently
+
+User = Union[discord.User, discord.Member]
+
+
+class PendingDelete:
+    __slots__ = ('channel_id', 'author_id', 'future')
+
+    def __init__(self, channel_id: int, author_id: Optional[int], future: asyncio.Future):
+        self.channel_id = channel_id
+        self.author_id = author_id  # None when the message wasn't cached
+        self.future = future
+
+
+class GuildDeletes:
+    __slots__ = ('pending', 'credits', 'task')
+
+    def __init__(self):
+        self.pending: list[PendingDelete] = []
+        # (channel id, author id) to [deleter, deletions left, expires at] for deletions the audit log counted
+        # which haven't been matched to a delete event yet, oldest first
+        self.credits: dict[tuple[int, int], deque[list]] = {}
+        self.task: Optional[asyncio.Task] = None
+
+
+class DeleteCorrelatorCog(commands.Cog):
+    """ Works out who deleted a message. Discord stacks a moderator's deletions of one member's messages in one channel
+    into a single audit log entry and counts them, so the increase in each entry's count since it was last seen says how
+    many deletions that moderator made. Those are matched to delete events by channel and author. Delete events are
+    collected for BATCH_DELAY seconds and the whole batch is matched against one audit log fetch. """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._guilds: dict[int, GuildDeletes] = {}
+
+    async def cog_load(self) -> None:
+        self.bot.services.delete_correlator = self
+        self.purge_loop.start()
+
+    async def cog_unload(self) -> None:
+        self.bot.services.delete_correlator = None
+        self.purge_loop.stop()
+        for guild_deletes in self._guilds.values():
+            if guild_deletes.task is not None:
+                guild_deletes.task.cancel()
+            for delete in guild_deletes.pending:
+                if not delete.future.done():
+                    delete.future.set_result(None)
+
+    async def resolve(self, guild: discord.Guild, channel_id: int, author_id: Optional[int]) -> Optional[User]:
+        """ Returns who deleted a message, or None if it was deleted by its author or a bot.
+        Pass None as the author if the message wasn't cached, then any deletion in the channel can match """
+        guild_deletes = self._guilds.get(guild.id)
+        if guild_deletes is None:
+            guild_deletes = self._guilds[guild.id] = GuildDeletes()
+
+        deleter = self.takeCredit(guild_deletes, channel_id, author_id)  # the gateway may have sent the entry already
+        if deleter is not None:
+            if guild_deletes.task is None and not guild_deletes.credits:
+                del self._guilds[guild.id]
+            return deleter
+
+        future = asyncio.get_running_loop().create_future()
+        guild_deletes.pending.append(PendingDelete(channel_id, author_id, future))
+        if guild_deletes.task is None:
+            guild_deletes.task = asyncio.create_task(self.resolveBatch(guild, guild_deletes))
+
+        return await asyncio.shield(future)
+
+    async def resolveBatch(self, guild: discord.Guild, guild_deletes: GuildDeletes):
+        await asyncio.sleep(BATCH_DELAY)
+
+        # deletions after this point wait for the next fetch, as this one might not count them
+        pending, guild_deletes.pending = guild_deletes.pending, []
+        guild_deletes.task = None
+        # deletes with a known author go first, so an uncached delete can't take the credit meant for one of them
+        pending.sort(key=lambda delete: delete.author_id is None)
+
+        try:
+            unresolved = []
+            for delete in pending:
+                deleter = self.takeCredit(guild_deletes, delete.channel_id, delete.author_id)
+                if deleter is not None:
+                    delete.future.set_result(deleter)
+                else:
+                    unresolved.append(delete)
+
+            if unresolved:
+                try:
+                    entries = await self.bot.services.audit_cache.fetch(guild, discord.AuditLogAction.message_delete)
+                except discord.HTTPException:  # missing audit log permission
+                    entries = []
+
+                for entry in reversed(entries):  # oldest first, so credits stay in order
+                    self.addEntry(entry)
+
+                for delete in unresolved:
+                    delete.future.set_result(self.takeCredit(guild_deletes, delete.channel_id, delete.author_id))
+        finally:
+            # on an error or cancel, anything left is logged as deleted by its author rather than waiting forever
+            for delete in pending:
+                if not delete.future.done():
+                    delete.future.set_result(None)
+
+            if not guild_deletes.pending and not guild_deletes.credits:
+                self._guilds.pop(guild.id, None)
+
+    def addEntry(self, entry: discord.AuditLogEntry):
+        """ Counts the deletions an entry made since it was last seen """
+        if entry.user is None:
+            return  # the user isn't cached, the next fetch will count these deletions instead
+
+        cached_count = self.bot.delete_log_cache.get(entry.guild.id, entry.id)
+        if cached_count is None:
+            # older entries seen for the first time were made before we were watching, so none of their deletions are ours
+            new_deletions = entry.extra.count if discord.utils.utcnow() - entry.created_at < NEW_ENTRY_WINDOW else 0
+        else:
+            # a fetch which started before the gateway sent a newer count can have a lower one, which is ignored
+            new_deletions = entry.extra.count - cached_count
+            if new_deletions <= 0:
+                return
+        self.bot.delete_log_cache.set(entry.guild.id, entry.id, entry.extra.count)
+
+        if new_deletions <= 0:
+            return
+
+        guild_deletes = self._guilds.get(entry.guild.id)
+        if guild_deletes is None:
+            guild_deletes = self._guilds[entry.guild.id] = GuildDeletes()
+
+        key = (entry.extra.channel.id, entry.target.id)
+        guild_deletes.credits.setdefault(key, deque()).append([entry.user, new_deletions, time.monotonic() + CREDIT_TTL])
+
+    def takeCredit(self, guild_deletes: GuildDeletes, channel_id: int, author_id: Optional[int]) -> Optional[User]:
+        now = time.monotonic()
+
+        if author_id is not None:
+            keys = [(channel_id, author_id)]
+        else:
+            keys = [key for key in guild_deletes.credits if key[0] == channel_id]
+
+        for key in keys:
+            credits = guild_deletes.credits.get(key)
+            if credits is None:
+                continue
+
+            while credits and credits[0][2] < now:
+                credits.popleft()  # expired
+
+            if credits:
+                credit = credits[0]
+                credit[1] -= 1
+                if credit[1] == 0:
+                    credits.popleft()
+                if not credits:
+                    del guild_deletes.credits[key]
+                return credit[0]
+
+            del guild_deletes.credits[key]
+
+        return None
+
+    @commands.Cog.listener()
+    async def on_audit_log_entry_create(self, entry: discord.AuditLogEntry):
+        if entry.action is not discord.AuditLogAction.message_delete:
+            return
+        if not self.bot.guild_settings.get(entry.guild.id, DEFAULT_SETTINGS).features & DELETE_LOGS:
+            return  # nothing would use the credit
+        self.addEntry(entry)
+
+    @tasks.loop(seconds=CREDIT_TTL)
+    async def purge_loop(self):
+        """ Drops credits whose delete event never came, and the guilds left with nothing waiting """
+        now = time.monotonic()
+        for guild_id, guild_deletes in list(self._guilds.items()):
+            for key, credits in list(guild_deletes.credits.items()):
+                while credits and credits[0][2] < now:
+                    credits.popleft()
+                if not credits:
+                    del guild_deletes.credits[key]
+
+            if guild_deletes.task is None and not guild_deletes.pending and not guild_deletes.credits:
+                del self._guilds[guild_id]
+
+
+async def setup(bot):
+    await bot.add_cog(DeleteCorrelatorCog(bot))
@@ -0,0 +1,156 @@
+import enum
+import logging
+import re
+from typing import Optional
+
+import discord
+from discord.ext import commands
+
+from cogs._events.message import MessageView
+
+log = logging.getLogger(__name__)
+
+INVITE_PATTERN = r"(?:https?://)?discord(?:app)?\.(?:com/invite|gg)/[a-zA-Z0-9]+/?|https?://dsc.gg/"
+LINK_PATTERN = r"https?://(?:www\.|(?!www))[^\s.]+\.[^\s]{2,}|www\.[^\s]+\.[^\s]{2,}"
+
+INVITE_REGEX = re.compile(INVITE_PATTERN)
+LINK_REGEX = re.compile(LINK_PATTERN)
+FILTER_REGEX = re.compile(f"(?P<invite>{INVITE_PATTERN})|(?P<link>{LINK_PATTERN})")  # both in one pass
+LINK_MARKERS = ("http", "www.", "discord")  # every invite and link pattern contains one of these
+
+
+class FilterMatch(enum.Flag):
+    """ The filter rules a message broke """
+    NONE = 0
+    CHAT = enum.auto()
+    INVITE = enum.auto()
+    LINK = enum.auto()
+
+
+class FilterEngineCog(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self._prescreens: dict[int, Optional[re.Pattern]] = {}  # guild id to the pre-screen pattern, None if no filters are enabled
+
+    async def cog_load(self) -> None:
+        self.bot.services.filter_engine = self
+
+    async def cog_unload(self) -> None:
+        self.bot.services.filter_engine = None
+
+    def buildPrescreen(self, guild: discord.Guild) -> Optional[re.Pattern]:
+        """ Builds a pattern of the first two characters of each filtered word plus the markers every invite and link contains.
+        A message that matches none of them can't break any filter so the full scan can be skipped. """
+        settingsCog = self.bot.services.settings
+
+        markers = {word[:2] for word in settingsCog.getChatFilter(guild)}
+        if settingsCog.isInviteFilterEnabled(guild) or settingsCog.isLinkFilterEnabled(guild):
+            markers.update(LINK_MARKERS)
+
+        if not markers:
+            return None
+        return re.compile("|".join(re.escape(marker) for marker in sorted(markers)), re.IGNORECASE)
+
+    def getPrescreen(self, guild: discord.Guild) -> Optional[re.Pattern]:
+        try:
+            return self._prescreens[guild.id]
+        except KeyError:
+            prescreen = self._prescreens[guild.id] = self.buildPrescreen(guild)
+            return prescreen
+
+    def invalidatePrescreen(self, guild_id: int):
+        """ Called when a guild's filters are changed so the pre-screen gets rebuilt on the next message """
+        self._prescreens.pop(guild_id, None)
+
+    def clearPrescreens(self):
+        self._prescreens.clear()
+
+    def isClean(self, guild: discord.Guild, content: str) -> bool:
+        """ A cheap check for whether a message can't break any filter """
+        prescreen = self.getPrescreen(guild)
+        return prescreen is None or prescreen.search(content) is None
+
+    def scan(self, guild: discord.Guild, content_lower: str) -> FilterMatch:
+        """ Checks a message against every filter the guild has enabled with a single scan of the message """
+        settingsCog = self.bot.services.settings
+
+        check_invite = settingsCog.isInviteFilterEnabled(guild)
+        check_link = settingsCog.isLinkFilterEnabled(guild)
+
+        matched = FilterMatch.NONE
+
+        if settingsCog.getChatFilter(guild) and self.bot.services.chat_filter.getMatcher(guild).search(content_lower):
+            matched |= FilterMatch.CHAT
+
+        if not check_invite and not check_link:
+            return matched
+
+        whitelist = self.bot.services.link_filter.getWhitelist(guild) if check_link else None
+
+        enabled = FilterMatch.NONE
+        if check_invite:
+            enabled |= FilterMatch.INVITE
+        if check_link:
+            enabled |= FilterMatch.LINK
+
+        for match in FILTER_REGEX.finditer(content_lower):
+            # An invite can be part of a longer link and a link can start with an invite, so check the other rule on the matched text
+            url = match.group()
+            is_invite = match.lastgroup == "invite"
+
+            if check_invite and (is_invite or INVITE_REGEX.search(url)):
+                matched |= FilterMatch.INVITE
+
+            if check_link and FilterMatch.LINK not in matched:
+                if is_invite:
+                    link_match = LINK_REGEX.search(url)
+                    url = link_match.group() if link_match else None
+                if url and not whitelist.allows(url):
+                    matched |= FilterMatch.LINK
+
+            if matched & enabled == enabled:
+                break
+
+        return matched
+
+    async def handleMessage(self, message: MessageView) -> FilterMatch:
+        """ Runs all filters on a new message and actions the first rule broken """
+        if not self.bot.services.settings.getSettings(message.guild).any_filter:
+            return FilterMatch.NONE
+
+        if self.isClean(message.guild, message.content):
+            return FilterMatch.NONE
+
+        matched = self.scan(message.guild, message.lower_content)
+
+        if FilterMatch.CHAT in matched:
+            await self.bot.services.chat_filter.handleChat(message)
+        elif FilterMatch.INVITE in matched:
+            await self.bot.services.invite_filter.handleInvite(message)
+        elif FilterMatch.LINK in matched:
+            await self.bot.services.link_filter.handleLink(message)
+
+        return matched
+
+    async def handleMessageEdit(self, before: MessageView, after: MessageView) -> FilterMatch:
+        """ Runs all filters on an edited message and actions the first rule broken """
+        if not self.bot.services.settings.getSettings(after.guild).any_filter:
+            return FilterMatch.NONE
+
+        if self.isClean(after.guild, after.content):
+            return FilterMatch.NONE
+
+        matched = self.scan(after.guild, after.lower_content)
+
+        if FilterMatch.CHAT in matched:
+            await self.bot.services.chat_filter.handleChatEdit(before, after)
+        elif FilterMatch.INVITE in matched:
+            await self.bot.services.invite_filter.handleInviteEdit(before, after)
+        elif FilterMatch.LINK in matched:
+            await self.bot.services.link_filter.handleLinkEdit(before, after)
+
+        return matched
+
+
+async def setup(bot):
+    await bot.add_cog(FilterEngineCog(bot))
@@ -1,12 +1,10 @@
 import logging
-import re
-from datetime import timedelta
-from io import BytesIO
 
-import discord
-from discord import NotFound
 from discord.ext import commands
 
+from cogs._events.message import MessageView
+from cogs.modules.logrender import LogRecord, formatTime, formatTimeForFile
+
 log = logging.getLogger(__name__)
 
 
@@ -14,125 +12,70 @@ class InviteFilterCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    async def handleInvite(self, message: discord.Message) -> bool:
-        content_lower = message.content.lower()
-
-        if re.search("(?:https?://)?discord(?:app)?\.(?:com/invite|gg)/[a-zA-Z0-9]+/?", content_lower) or re.search("https?://dsc.gg/", content_lower):
-            try:
-                await message.delete()
-            except NotFound:  # another bot deleted it
-                pass
-            try:
-                await message.author.timeout(timedelta(seconds=3))
-            except discord.Forbidden as e:  # no permission
-                pass
-
-            # log it
-            settingsCog = self.bot.get_cog("SettingsCommand")
-            modLogChannel = settingsCog.getModLogChannel(message.guild)
-            if modLogChannel:
-                embed = discord.Embed()
-                embed.set_author(name="Discord Invite Posted", icon_url=message.author.display_avatar.url)
-                embed.colour = discord.Colour(0x2F3136)
-                embedDescription = f'{message.author.mention} ({message.author}) tried to post a Discord server invite.\n\n'
-
-                msg_content = message.clean_content.replace("`", "")
-
-                embedDescription += f'**Message\'s Info:**\n' \
-                                    f'Message ID: `{message.id}`\n' \
-                                    f'Channel: {message.channel.mention}\n' \
-                                    f'Time: {discord.utils.format_dt(message.created_at, "F")} ({discord.utils.format_dt(message.created_at, "R")})\n' \
-                                    f'Attachments: `{len(message.attachments)}`'
-                embedDescription += f'\n\n**Message Content:**\n`{msg_content}`'
-
-                if len(message.attachments) != 0:
-                    attachement1 = message.attachments[0]
-                    if attachement1.content_type.startswith("image"):
-                        embed.set_image(url=attachement1.url)
-                        embedDescription += f"\n\n**Message Image:**"
-                embed.description = embedDescription
-
-                file = None
-                content = None
-                if len(embed.description) > 4096 or len(embed) > 6000:
-                    # attach as a file
-                    embed = None
-                    content = "**Server Invite Filter!**"
-                    fileContent = f'{message.author} tried to post a Discord server invite.\n\n' \
-                                  f'Message ID: {message.id}\n' \
-                                  f'Channel: #{message.channel}\n' \
-                                  f'Time (UTC): {message.created_at.strftime("%Y-%m-%d %H:%M-%S")}\n' \
-                                  f'Attachments: {len(message.attachments)}\n\n' \
-                                  f'Message Content:\n{message.clean_content}'
-                    buffer = BytesIO(fileContent.encode('utf-8'))
-                    file = discord.File(fp=buffer, filename='invite_filter.txt')
-
-                await modLogChannel.send(content=content, embed=embed, file=file)
-            return True
-        else:
-            return False
-
-    async def handleInviteEdit(self, before, after) -> bool:
-        content_lower = after.content.lower()
-
-        if re.search("(?:https?://)?discord(?:app)?\.(?:com/invite|gg)/[a-zA-Z0-9]+/?", content_lower) or re.search("https?://dsc.gg/", content_lower):
-            try:
-                await after.delete()
-            except NotFound:  # another bot deleted it
-                pass
-            try:
-                await after.author.timeout(timedelta(seconds=3))
-            except discord.Forbidden as e:  # no permission
-                pass
-
-            # log it
-            settingsCog = self.bot.get_cog("SettingsCommand")
-            modLogChannel = settingsCog.getModLogChannel(after.guild)
-            if modLogChannel:
-                embed = discord.Embed()
-                embed.set_author(name="Discord Invite Posted", icon_url=after.author.display_avatar.url)
-                embed.colour = discord.Colour(0x2F3136)
-                embedDescription = f'{after.author.mention} ({after.author}) tried to edit a Discord server invite into a message.\n\n'
-
-                embedDescription += f'**Message\'s Info:**\n' \
-                                    f'Message ID: `{after.id}`\n' \
-                                    f'Channel: {after.channel.mention}\n' \
-                                    f'Time: {discord.utils.format_dt(after.created_at, "F")} ({discord.utils.format_dt(after.created_at, "R")})\n' \
-                                    f'Attachments: `{len(after.attachments)}`'
-
-                content_before = before.clean_content.replace("`", "")
-                content_after = after.clean_content.replace("`", "")
-
-                embedDescription += f'\n\n**Message Before:**\n`{content_before}`'
-                embedDescription += f'\n\n**Message After:**\n`{content_after}`'
-
-                if len(after.attachments) != 0:
-                    attachement1 = after.attachments[0]
-                    if attachement1.content_type.startswith("image"):
-                        embed.set_image(url=attachement1.url)
-                        embedDescription += f"\n\n**Message Image:**"
-                embed.description = embedDescription
-
-                file = None
-                content = None
-                if len(embed.description) > 4096 or len(embed) > 6000:
-                    # attach as a file
-                    embed = None
-                    content = "**Server Invite Filter!**"
-                    fileContent = f'{after.author} tried to edit a Discord server invite into a message.\n\n' \
-                                  f'Message ID: {after.id}\n' \
-                                  f'Channel: #{after.channel}\n' \
-                                  f'Time (UTC): {after.created_at.strftime("%Y-%m-%d %H:%M-%S")}\n' \
-                                  f'Attachments: {len(after.attachments)}' \
-                                  f'\n\nMessage Content Before:\n{before.clean_content}' \
-                                  f'\n\nMessage Content After:\n{after.clean_content}'
-                    buffer = BytesIO(fileContent.encode('utf-8'))
-                    file = discord.File(fp=buffer, filename='invite_filter.txt')
-
-                await modLogChannel.send(content=content, embed=embed, file=file)
-            return True
-        else:
-            return False
+    async def cog_load(self) -> None:
+        self.bot.services.invite_filter = self
+
+    async def cog_unload(self) -> None:
+        self.bot.services.invite_filter = None
+
+    async def handleInvite(self, message: MessageView):
+        """ Deletes and logs a message which contains a Discord server invite """
+        modQueue = self.bot.services.mod_queue
+        modQueue.queueDelete(message.message)
+        modQueue.queueTimeout(message.author)
+
+        # log it
+        settingsCog = self.bot.services.settings
+        modLogChannel = settingsCog.getModLogChannel(message.guild)
+        if modLogChannel:
+            record = LogRecord("Discord Invite Posted", icon_url=message.author.display_avatar.url)
+            record.add(f'{message.author.mention} ({message.author}) tried to post a Discord server invite.\n',
+                       f'{message.author} tried to post a Discord server invite.\n')
+
+            record.heading("Message's Info")
+            record.line('Message ID', f'`{message.id}`', f'{message.id}')
+            record.line('Channel', message.channel.mention, f'#{message.channel}')
+            record.add(f'Time: {formatTime(message.created_at)}\n', f'Time (UTC): {formatTimeForFile(message.created_at)}\n')
+            record.line('Attachments', f'`{len(message.attachments)}`', f'{len(message.attachments)}')
+
+            record.heading("Message Content")
+            record.add(f'`{message.escaped_content}`\n', f'{message.clean_content}\n')
+            record.messageImage(message)
+
+            content, embed, file = record.render("**Server Invite Filter!**", 'invite_filter.txt')
+
+            modQueue.queueLog(modLogChannel, "Invite Filter", message, content=content, embed=embed, file=file)
+
+    async def handleInviteEdit(self, before: MessageView, after: MessageView):
+        """ Deletes and logs a message which was edited to contain a Discord server invite """
+        modQueue = self.bot.services.mod_queue
+        modQueue.queueDelete(after.message)
+        modQueue.queueTimeout(after.author)
+
+        # log it
+        settingsCog = self.bot.services.settings
+        modLogChannel = settingsCog.getModLogChannel(after.guild)
+        if modLogChannel:
+            record = LogRecord("Discord Invite Posted", icon_url=after.author.display_avatar.url)
+            record.add(f'{after.author.mention} ({after.author}) tried to edit a Discord server invite into a message.\n',
+                       f'{after.author} tried to edit a Discord server invite into a message.\n')
+
+            record.heading("Message's Info")
+            record.line('Message ID', f'`{after.id}`', f'{after.id}')
+            record.line('Channel', after.channel.mention, f'#{after.channel}')
+            record.add(f'Time: {formatTime(after.created_at)}\n', f'Time (UTC): {formatTimeForFile(after.created_at)}\n')
+            record.line('Attachments', f'`{len(after.attachments)}`', f'{len(after.attachments)}')
+
+            record.heading("Message Before")
+            record.add(f'`{before.escaped_content}`\n', f'{before.clean_content}\n')
+
+            record.heading("Message After")
+            record.add(f'`{after.escaped_content}`\n', f'{after.clean_content}\n')
+            record.messageImage(after)
+
+            content, embed, file = record.render("**Server Invite Filter!**", 'invite_filter.txt')
+
+            modQueue.queueLog(modLogChannel, "Invite Filter", after, content=content, embed=embed, file=file)
 
 
 async def setup(bot):
@@ -1,148 +1,172 @@
 import logging
 import re
-from datetime import timedelta
-from io import BytesIO
 
 import discord
-from discord import NotFound
 from discord.ext import commands
 
+from cogs._events.message import MessageView
+from cogs.modules.logrender import LogRecord, formatTime, formatTimeForFile
+
 log = logging.getLogger(__name__)
 
 
-class LinkFilterCog(commands.Cog):
-    def __init__(self, bot):
-        self.bot = bot
+URL_PARTS_REGEX = re.compile(r"(?:[a-z]+://)?(?:www\.)?([^/?#\s:,()\[\]<>]*)(?::\d*)?([^?#\s]*)")
+# where a link starts inside a matched run of text, such as the target of a masked link or links joined by a comma
+URL_START_REGEX = re.compile(r"https?://|(?<![\w./-])www\.")
 
-    async def handleLink(self, message: discord.Message) -> bool:
-        content_lower = message.content.lower()
-
-        settingsCog = self.bot.get_cog("SettingsCommand")
-
-        whitelisted_links = settingsCog.getWhitelistedLinks(message.guild)
-
-        for link in whitelisted_links:
-            content_lower = content_lower.replace(link, "")
-
-        if re.search("(https?://(?:www\\.|(?!www))[^\\s.]+\\.[^\\s]{2,}|www\\.[^\\s]+\\.[^\\s]{2,})", content_lower):
-            try:
-                await message.delete()
-            except NotFound:  # another bot deleted it
-                pass
-            try:
-                await message.author.timeout(timedelta(seconds=3))
-            except discord.Forbidden as e:  # no permission
-                pass
-            # log it
-            modLogChannel = settingsCog.getModLogChannel(message.guild)
-            if modLogChannel:
-                embed = discord.Embed()
-                embed.set_author(name="Link Posted", icon_url=message.author.display_avatar.url)
-                embed.colour = discord.Colour(0x2F3136)
-                embedDescription = f'{message.author.mention} ({message.author}) tried to post a link.\n\n'
-                embedDescription += f'**Message\'s Info:**\n' \
-                                    f'Message ID: `{message.id}`\n' \
-                                    f'Channel: {message.channel.mention}\n' \
-                                    f'Time: {discord.utils.format_dt(message.created_at, "F")} ({discord.utils.format_dt(message.created_at, "R")})\n' \
-                                    f'Attachments: `{len(message.attachments)}`'
-
-                msg_content = message.clean_content.replace("`", "")
-                embedDescription += f'\n\n**Message Content:**\n`{msg_content}`'
-
-                if len(message.attachments) != 0:
-                    attachement1 = message.attachments[0]
-                    if attachement1.content_type.startswith("image"):
-                        embed.set_image(url=attachement1.url)
-                        embedDescription += f"\n\n**Message Image:**"
-                embed.description = embedDescription
-
-                file = None
-                content = None
-                if len(embed.description) > 4096 or len(embed) > 6000:
-                    # attach as a file
-                    embed = None
-                    content = "**Link Filter!**"
-                    fileContent = f'{message.author} tried to post a link.\n\n' \
-                                  f'Message ID: {message.id}\n' \
-                                  f'Channel: #{message.channel}\n' \
-                                  f'Time (UTC): {message.created_at.strftime("%Y-%m-%d %H:%M-%S")}\n' \
-                                  f'Attachments: {len(message.attachments)}\n\n' \
-                                  f'Message Content:\n{message.clean_content}'
-                    buffer = BytesIO(fileContent.encode('utf-8'))
-                    file = discord.File(fp=buffer, filename='link_filter.txt')
-
-                await modLogChannel.send(content=content, embed=embed, file=file)
-            return True
-        else:
-            return False
 
-    async def handleLinkEdit(self, before, after) -> bool:
-        content_lower = after.content.lower()
-
-        settingsCog = self.bot.get_cog("SettingsCommand")
-
-        whitelisted_links = settingsCog.getWhitelistedLinks(after.guild)
-
-        for link in whitelisted_links:
-            content_lower = content_lower.replace(link, "")
-
-        if re.search("(https?://(?:www\\.|(?!www))[^\\s.]+\\.[^\\s]{2,}|www\\.[^\\s]+\\.[^\\s]{2,})", content_lower):
-            try:
-                await after.delete()
-            except NotFound:  # another bot deleted it
-                pass
-            try:
-                await after.author.timeout(timedelta(seconds=3))
-            except discord.Forbidden as e:  # no permission
-                pass
-            # log it
-            modLogChannel = settingsCog.getModLogChannel(after.guild)
-            if modLogChannel:
-                embed = discord.Embed()
-                embed.set_author(name="Link Posted", icon_url=after.author.display_avatar.url)
-                embed.colour = discord.Colour(0x2F3136)
-                embedDescription = f'{after.author.mention} ({after.author}) tried to edit a link into a message.\n\n'
-
-                embedDescription += f'**Message\'s Info:**\n' \
-                                    f'Message ID: `{after.id}`\n' \
-                                    f'Channel: {after.channel.mention}\n' \
-                                    f'Time: {discord.utils.format_dt(after.created_at, "F")} ({discord.utils.format_dt(after.created_at, "R")})\n' \
-                                    f'Attachments: `{len(after.attachments)}`'
-
-                content_before = before.clean_content.replace("`", "")
-                content_after = after.clean_content.replace("`", "")
-
-                embedDescription += f'\n\n**Message Before:**\n`{content_before}`'
-                embedDescription += f'\n\n**Message After:**\n`{content_after}`'
-
-                if len(after.attachments) != 0:
-                    attachement1 = after.attachments[0]
-                    if attachement1.content_type.startswith("image"):
-                        embed.set_image(url=attachement1.url)
-                        embedDescription += f"\n\n**Message Image:**"
-                embed.description = embedDescription
-
-                file = None
-                content = None
-                if len(embed.description) > 4096 or len(embed) > 6000:
-                    # attach as a file
-                    embed = None
-                    content = "**Link Filter!**"
-                    fileContent = f'{after.author} tried to edit a link into a message.\n\n' \
-                                  f'Message ID: {after.id}\n' \
-                                  f'Channel: #{after.channel}\n' \
-                                  f'Time (UTC): {after.created_at.strftime("%Y-%m-%d %H:%M-%S")}\n' \
-                                  f'Attachments: {len(after.attachments)}' \
-                                  f'\n\nMessage Content Before:\n{before.clean_content}' \
-                                  f'\n\nMessage Content After:\n{after.clean_content}'
-                    buffer = BytesIO(fileContent.encode('utf-8'))
-                    file = discord.File(fp=buffer, filename='link_filter.txt')
-
-                await modLogChannel.send(content=content, embed=embed, file=file)
-            return True
-        else:
+def splitLink(link: str) -> tuple[str, list[str]]:
+    """ Splits a lowercase link into its host and path segments, ignoring the scheme, www. and any query """
+    host, path = URL_PARTS_REGEX.match(link).groups()
+    return host.rstrip("."), [segment for segment in path.split("/") if segment]
+
+
+class LinkWhitelist:
+    """ An index of a guild's whitelisted links.
+    Whitelisted hosts are kept in a set and whitelisted paths in a trie of path segments for each host.
+    A whitelisted host also allows its subdomains. """
+
+    __slots__ = ('_hosts', '_paths')
+
+    _END = ""  # marks the end of a whitelisted path, path segments are never empty
+
+    def __init__(self, links: list[str]) -> None:
+        self._hosts: set[str] = set()
+        self._paths: dict[str, dict] = {}
+
+        for link in links:
+            host, segments = splitLink(link)
+            if not host:
+                continue
+
+            if not segments:
+                self._hosts.add(host)
+                continue
+
+            node = self._paths.setdefault(host, {})
+            for segment in segments:
+                node = node.setdefault(segment, {})
+            node[self._END] = True
+
+    def allows(self, text: str) -> bool:
+        """ Returns True if every link in the matched text is covered by the whitelist """
+        if not self._hosts and not self._paths:
             return False
 
+        starts = [match.start() for match in URL_START_REGEX.finditer(text)] or [0]
+        starts[0] = 0
+        ends = starts[1:] + [len(text)]
+        return all(self.allowsLink(text[start:end]) for start, end in zip(starts, ends))
+
+    def allowsLink(self, url: str) -> bool:
+        host, segments = splitLink(url)
+        while host:
+            if host in self._hosts:
+                return True
+
+            node = self._paths.get(host)
+            if node is not None:
+                for segment in segments:
+                    node = node.get(segment)
+                    if node is None:
+                        break
+                    if self._END in node:
+                        return True
+
+            # try the parent domain
+            dot = host.find(".")
+            if dot == -1:
+                return False
+            host = host[dot + 1:]
+        return False
+
+
+class LinkFilterCog(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self._whitelists: dict[int, LinkWhitelist] = {}  # guild id to the indexed whitelisted links
+
+    async def cog_load(self) -> None:
+        self.bot.services.link_filter = self
+
+    async def cog_unload(self) -> None:
+        self.bot.services.link_filter = None
+
+    def getWhitelist(self, guild: discord.Guild) -> LinkWhitelist:
+        """ Returns the indexed whitelisted links for a guild, building it if needed """
+        whitelist = self._whitelists.get(guild.id)
+        if whitelist is None:
+            whitelisted_links = self.bot.services.settings.getWhitelistedLinks(guild)
+            whitelist = LinkWhitelist(whitelisted_links)
+            self._whitelists[guild.id] = whitelist
+        return whitelist
+
+    def invalidateWhitelist(self, guild_id: int):
+        """ Called when a guild's whitelisted links are changed so the index gets rebuilt on the next message """
+        self._whitelists.pop(guild_id, None)
+
+    def clearWhitelists(self):
+        self._whitelists.clear()
+
+    async def handleLink(self, message: MessageView):
+        """ Deletes and logs a message which contains a link that is not whitelisted """
+        settingsCog = self.bot.services.settings
+
+        modQueue = self.bot.services.mod_queue
+        modQueue.queueDelete(message.message)
+        modQueue.queueTimeout(message.author)
+        # log it
+        modLogChannel = settingsCog.getModLogChannel(message.guild)
+        if modLogChannel:
+            record = LogRecord("Link Posted", icon_url=message.author.display_avatar.url)
+            record.add(f'{message.author.mention} ({message.author}) tried to post a link.\n',
+                       f'{message.author} tried to post a link.\n')
+
+            record.heading("Message's Info")
+            record.line('Message ID', f'`{message.id}`', f'{message.id}')
+            record.line('Channel', message.channel.mention, f'#{message.channel}')
+            record.add(f'Time: {formatTime(message.created_at)}\n', f'Time (UTC): {formatTimeForFile(message.created_at)}\n')
+            record.line('Attachments', f'`{len(message.attachments)}`', f'{len(message.attachments)}')
+
+            record.heading("Message Content")
+            record.add(f'`{message.escaped_content}`\n', f'{message.clean_content}\n')
+            record.messageImage(message)
+
+            content, embed, file = record.render("**Link Filter!**", 'link_filter.txt')
+
+            modQueue.queueLog(modLogChannel, "Link Filter", message, content=content, embed=embed, file=file)
+
+    async def handleLinkEdit(self, before: MessageView, after: MessageView):
+        """ Deletes and logs a message which was edited to contain a link that is not whitelisted """
+        settingsCog = self.bot.services.settings
+
+        modQueue = self.bot.services.mod_queue
+        modQueue.queueDelete(after.message)
+        modQueue.queueTimeout(after.author)
+        # log it
+        modLogChannel = settingsCog.getModLogChannel(after.guild)
+        if modLogChannel:
+            record = LogRecord("Link Posted", icon_url=after.author.display_avatar.url)
+            record.add(f'{after.author.mention} ({after.author}) tried to edit a link into a message.\n',
+                       f'{after.author} tried to edit a link into a message.\n')
+
+            record.heading("Message's Info")
+            record.line('Message ID', f'`{after.id}`', f'{after.id}')
+            record.line('Channel', after.channel.mention, f'#{after.channel}')
+            record.add(f'Time: {formatTime(after.created_at)}\n', f'Time (UTC): {formatTimeForFile(after.created_at)}\n')
+            record.line('Attachments', f'`{len(after.attachments)}`', f'{len(after.attachments)}')
+
+            record.heading("Message Before")
+            record.add(f'`{before.escaped_content}`\n', f'{before.clean_content}\n')
+
+            record.heading("Message After")
+            record.add(f'`{after.escaped_content}`\n', f'{after.clean_content}\n')
+            record.messageImage(after)
+
+            content, embed, file = record.render("**Link Filter!**", 'link_filter.txt')
+
+            modQueue.queueLog(modLogChannel, "Link Filter", after, content=content, embed=embed, file=file)
+
 
 async def setup(bot):
     await bot.add_cog(LinkFilterCog(bot))
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+import traceback
+from io import BytesIO
+from typing import Any, Optional
+
+import discord
+from discord.ext import commands, tasks
+
+from cogs.modules.logrender import MAX_DESCRIPTION_SIZE, MAX_EMBED_SIZE
+
+log = logging.getLogger(__name__)
+
+MAX_EMBEDS = 10  # the most embeds discord allows in one message
+
+
+class LogBufferCog(commands.Cog):
+    """ Log messages for guilds that have log batching enabled are buffered per log channel
+    and sent together, up to 10 embeds per message, once the guild's batch delay has passed. """
+
+    def __init__(self, bot):
+        self.bot = bot
+
+        self._batch_lock = asyncio.Lock()
+        self._buffers: dict[int, list] = {}  # channel id to [channel, flush deadline, buffered logs]
+
+        self.flush_loop.start()
+
+    async def cog_load(self) -> None:
+        self.bot.services.log_buffer = self
+
+    async def cog_unload(self) -> None:
+        self.bot.services.log_buffer = None
+        self.flush_loop.stop()
+        async with self._batch_lock:
+            await self.flush(force=True)  # don't lose logs on reload
+
+    async def send(self, channel: discord.abc.Messageable, *, content: Optional[str] = None, embed: Optional[discord.Embed] = None,
+                   file: Optional[discord.File] = None, view: Optional[discord.ui.View] = None):
+        """ Sends a log message, or buffers it if the guild has log batching enabled """
+        delay = self.bot.services.settings.getLogBatchDelay(channel.guild)
+        if not delay:
+            return await channel.send(content=content, embed=embed, file=file, view=view)
+
+        buffer = self._buffers.get(channel.id)
+        if buffer is None:
+            buffer = self._buffers[channel.id] = [channel, time.monotonic() + delay, []]
+        buffer[2].append((content, embed, file, view))
+
+    @tasks.loop(seconds=0.5)
+    async def flush_loop(self):
+        async with self._batch_lock:
+            await self.flush()
+
+    @flush_loop.error
+    async def on_flush_loop_error(self, *args: Any) -> None:
+        exception: Exception = args[-1]
+        log.error('Unhandled exception in internal background task flush_loop')
+        traceback.print_exception(type(exception), exception, exception.__traceback__)
+
+        await asyncio.sleep(5)
+        log.info("Restarting task...")
+
+        self.flush_loop.restart()
+
+    async def flush(self, force: bool = False):
+        """ Sends every buffer that is due, or is already full enough for a message """
+        now = time.monotonic()
+        due = [channel_id for channel_id, (_, deadline, logs) in self._buffers.items()
+               if force or deadline <= now or len(logs) >= MAX_EMBEDS]
+
+        for channel_id in due:
+            channel, _, logs = self._buffers.pop(channel_id)
+            try:
+                await self.sendBatch(channel, logs)
+            except discord.HTTPException as e:
+                log.warning(f'Failed to send {len(logs)} buffered logs to channel {channel_id}: {e}')
+
+    async def sendBatch(self, channel: discord.abc.Messageable, logs: list):
+        """ Sends buffered logs in order. Logs that are plain embeds are grouped, anything else is sent on its own """
+        embeds = []
+        for content, embed, file, view in logs:
+            if embed is not None and content is None and file is None:
+                embeds.append((embed, view))
+                continue
+
+            await self.sendEmbeds(channel, embeds)
+            embeds = []
+            await channel.send(content=content, embed=embed, file=file, view=view)
+
+        await self.sendEmbeds(channel, embeds)
+
+    async def sendEmbeds(self, channel: discord.abc.Messageable, embeds: list):
+        if len(embeds) == 1:
+            embed, view = embeds[0]
+            return await channel.send(embed=embed, view=view)
+
+        for i in range(0, len(embeds), MAX_EMBEDS):
+            chunk = [self.addJumpLinks(embed, view) for embed, view in embeds[i:i + MAX_EMBEDS]]
+
+            if sum(len(embed) for embed in chunk) <= MAX_EMBED_SIZE:
+                await channel.send(embeds=chunk)
+            else:
+                # too big for one message so attach as a file
+                fileContent = '\n\n'.join(self.embedToText(embed) for embed in chunk)
+                buffer = BytesIO(fileContent.encode('utf-8'))
+                file = discord.File(fp=buffer, filename='logs.txt')
+                await channel.send(content=f"**{len(chunk)} Logs!**", file=file)
+
+    def addJumpLinks(self, embed: discord.Embed, view: Optional[discord.ui.View]) -> discord.Embed:
+        """ Several log embeds share one message so their link buttons are moved into the embed """
+        if view is None:
+            return embed
+
+        for item in view.children:
+            url = getattr(item, 'url', None)
+            if url:
+                link = f"\n\n[{item.label}]({url})"
+                if len(embed.description or "") + len(link) <= MAX_DESCRIPTION_SIZE:
+                    embed.description = (embed.description or "") + link
+        return embed
+
+    def embedToText(self, embed: discord.Embed) -> str:
+        lines = [embed.author.name, embed.title, embed.description]
+        for field in embed.fields:
+            lines.append(f"{field.name}\n{field.value}")
+        lines.append(embed.footer.text)
+        return '\n'.join(line for line in lines if line)
+
+
+async def setup(bot):
+    await bot.add_cog(LogBufferCog(bot))
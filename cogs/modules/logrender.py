@@ -0,0 +1,93 @@
+import logging
+from datetime import datetime
+from io import BytesIO
+from typing import Optional
+
+import discord
+
+log = logging.getLogger(__name__)
+
+MAX_DESCRIPTION_SIZE = 4096
+MAX_EMBED_SIZE = 6000
+
+
+def formatTime(time: datetime) -> str:
+    """ Discord timestamp shown in the embed """
+    return f'{discord.utils.format_dt(time, "F")} ({discord.utils.format_dt(time, "R")})'
+
+
+def formatTimeForFile(time: datetime) -> str:
+    return time.strftime("%Y-%m-%d %H:%M-%S")  # year-month-day hour:min:sec
+
+
+class LogRecord:
+    """ A log message built once from parts that each have an embed form and a plain text form.
+    The embed size is counted as parts are added, so only the form that is sent ever gets joined together. """
+
+    __slots__ = ('name', 'icon_url', 'colour', 'timestamp', 'image_url', 'thumbnail_url', '_embed_parts', '_file_parts', '_description_size')
+
+    def __init__(self, name: Optional[str], icon_url: Optional[str] = None, *, timestamp: Optional[datetime] = None,
+                 colour: discord.Colour = discord.Colour(0x2F3136)):
+        self.name = name
+        self.icon_url = icon_url
+        self.colour = colour
+        self.timestamp = timestamp
+        self.image_url = None
+        self.thumbnail_url = None
+
+        self._embed_parts: list[str] = []
+        self._file_parts: list[str] = []
+        self._description_size = 0
+
+    def add(self, embed_text: str, file_text: Optional[str] = None):
+        """ Adds text to the log. file_text defaults to embed_text, pass an empty string to leave it out of the file """
+        self._embed_parts.append(embed_text)
+        self._description_size += len(embed_text)
+        self._file_parts.append(embed_text if file_text is None else file_text)
+
+    def line(self, label: str, embed_value: str, file_value: Optional[str] = None):
+        """ Adds a 'Label: value' line """
+        self.add(f'{label}: {embed_value}\n', None if file_value is None else f'{label}: {file_value}\n')
+
+    def heading(self, title: str):
+        self.add(f'\n**{title}:**\n', f'\n{title}:\n')
+
+    def messageImage(self, message: discord.Message):
+        """ Shows the first image attached to a message in the embed """
+        for attachment in message.attachments:
+            if attachment.content_type and attachment.content_type.startswith("image"):
+                self.image_url = attachment.url
+                self.add('\n**Message Image:**', '')
+                break
+
+    @property
+    def size(self) -> int:
+        return len(self.name or '') + self._description_size
+
+    def fits(self) -> bool:
+        """ Whether the log fits in an embed """
+        return self._description_size <= MAX_DESCRIPTION_SIZE and self.size <= MAX_EMBED_SIZE
+
+    def toEmbed(self) -> discord.Embed:
+        embed = discord.Embed(description=''.join(self._embed_parts).rstrip('\n'), colour=self.colour, timestamp=self.timestamp)
+        if self.name:
+            embed.set_author(name=self.name, icon_url=self.icon_url)
+        if self.image_url:
+            embed.set_image(url=self.image_url)
+        if self.thumbnail_url:
+            embed.set_thumbnail(url=self.thumbnail_url)
+        return embed
+
+    def toFile(self, filename: str) -> discord.File:
+        buffer = BytesIO(''.join(self._file_parts).rstrip('\n').encode('utf-8'))
+        return discord.File(fp=buffer, filename=filename)
+
+    def render(self, content: str, filename: str) -> tuple[Optional[str], Optional[discord.Embed], Optional[discord.File]]:
+        """ Returns the content, embed and file to send. Logs too big for an embed are attached as a text file """
+        if self.fits():
+            return None, self.toEmbed(), None
+        return content, None, self.toFile(filename)
+
+
+async def setup(bot):
+    pass  # only holds the log renderer, which the logging cogs import
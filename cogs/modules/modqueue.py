@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import time
+import traceback
+from datetime import timedelta
+from typing import Any, Optional
+
+import discord
+from discord.ext import commands, tasks
+
+from cogs.modules.logrender import LogRecord, formatTimeForFile
+
+log = logging.getLogger(__name__)
+
+TIMEOUT_LENGTH = timedelta(seconds=3)  # how long members get timed out for breaking a filter
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=1)  # discord won't bulk delete messages older than 14 days
+
+
+class ModerationQueueCog(commands.Cog):
+    """ Collects filter actions and flushes them in batches, so a spam wave makes one bulk delete per channel,
+    one timeout per member and one mod log message per log channel instead of one of each per message. """
+
+    def __init__(self, bot):
+        self.bot = bot
+
+        self._batch_lock = asyncio.Lock()
+        self._deletes: dict[int, dict[int, discord.Message]] = {}  # channel id to the messages to delete
+        self._timeouts: dict[int, discord.Member] = {}  # member id to the members to time out
+        self._timed_out_until: dict[int, float] = {}  # member id to when their last timeout ends, so repeats are skipped
+        self._logs: dict[int, list] = {}  # log channel id to the log entries waiting to be sent
+
+        self.flush_loop.start()
+
+    async def cog_load(self) -> None:
+        self.bot.services.mod_queue = self
+
+    async def cog_unload(self) -> None:
+        self.bot.services.mod_queue = None
+        self.flush_loop.stop()
+        async with self._batch_lock:
+            await self.flush()  # don't leave filtered messages up on reload
+
+    def queueDelete(self, message: discord.Message):
+        self._deletes.setdefault(message.channel.id, {})[message.id] = message
+
+    def queueTimeout(self, member: discord.Member):
+        if self._timed_out_until.get(member.id, 0) > time.monotonic():
+            return  # already timed out
+        self._timeouts[member.id] = member
+
+    def queueLog(self, channel: discord.TextChannel, rule: str, message: discord.Message, *,
+                 content: Optional[str] = None, embed: Optional[discord.Embed] = None, file: Optional[discord.File] = None):
+        """ Queues a mod log entry. If more than one entry is queued for a channel they are sent as a single summary """
+        self._logs.setdefault(channel.id, []).append((channel, rule, message, content, embed, file))
+
+    def queueSizes(self) -> tuple[int, int, int]:
+        """ The number of deletes, timeouts and mod logs waiting to be flushed """
+        return (sum(len(messages) for messages in self._deletes.values()), len(self._timeouts),
+                sum(len(entries) for entries in self._logs.values()))
+
+    @tasks.loop(seconds=0.5)
+    async def flush_loop(self):
+        async with self._batch_lock:
+            await self.flush()
+
+    @flush_loop.error
+    async def on_flush_loop_error(self, *args: Any) -> None:
+        exception: Exception = args[-1]
+        log.error('Unhandled exception in internal background task flush_loop')
+        traceback.print_exception(type(exception), exception, exception.__traceback__)
+
+        await asyncio.sleep(5)
+        log.info("Restarting task...")
+
+        self.flush_loop.restart()
+
+    async def flush(self):
+        deletes, self._deletes = self._deletes, {}
+        timeouts, self._timeouts = self._timeouts, {}
+        logs, self._logs = self._logs, {}
+
+        for messages in deletes.values():
+            await self.deleteMessages(list(messages.values()))
+
+        for member in timeouts.values():
+            self._timed_out_until[member.id] = time.monotonic() + TIMEOUT_LENGTH.total_seconds()
+            try:
+                await member.timeout(TIMEOUT_LENGTH)
+            except discord.Forbidden:  # no permission
+                pass
+            except discord.NotFound:  # member left
+                pass
+            except discord.HTTPException as e:
+                log.warning(f'Failed to time out member: {e}')
+
+        now = time.monotonic()
+        self._timed_out_until = {member_id: until for member_id, until in self._timed_out_until.items() if until > now}
+
+        for entries in logs.values():
+            try:
+                await self.sendLogs(entries)
+            except discord.HTTPException as e:
+                log.warning(f'Failed to send mod log: {e}')
+
+    async def deleteMessages(self, messages: list[discord.Message]):
+        """ Deletes messages from one channel, using bulk deletes where discord allows it """
+        channel = messages[0].channel
+        oldest = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+
+        bulk = [message for message in messages if message.created_at > oldest]
+        single = [message for message in messages if message.created_at <= oldest]
+
+        if len(bulk) == 1:
+            single.extend(bulk)
+            bulk = []
+
+        for i in range(0, len(bulk), 100):
+            chunk = bulk[i:i + 100]
+            try:
+                await channel.delete_messages(chunk)
+            except discord.HTTPException:
+                single.extend(chunk)  # fall back to deleting them one by one
+
+        for message in single:
+            try:
+                await message.delete()
+            except discord.NotFound:  # another bot deleted it
+                pass
+            except discord.Forbidden:  # no permission in this channel, so the rest would fail too
+                break
+            except discord.HTTPException as e:
+                log.warning(f'Failed to delete filtered message: {e}')
+
+    async def sendLogs(self, entries: list):
+        channel = entries[0][0]
+
+        if len(entries) == 1:
+            _, _, _, content, embed, file = entries[0]
+            return await self.bot.services.log_buffer.send(channel, content=content, embed=embed, file=file)
+
+        record = LogRecord("Filter Summary", timestamp=discord.utils.utcnow())
+        record.add(f'{len(entries)} messages were removed by the filters.\n\n')
+        for _, rule, message, _, _, _ in entries:
+            record.add(f'**{rule}:** {message.author.mention} ({message.author}) in {message.channel.mention} (`{message.id}`)\n',
+                       f'- {rule}:\n'
+                       f'  Author: {message.author} ({message.author.id})\n'
+                       f'  Channel: #{message.channel}\n'
+                       f'  Message ID: {message.id}\n'
+                       f'  Time (UTC): {formatTimeForFile(message.created_at)}\n'
+                       f'  Content: {message.clean_content}\n\n')
+
+        # the summary is always attached as a file so the removed messages can be read in full
+        if record.fits():
+            content, embed = None, record.toEmbed()
+        else:
+            content, embed = "**Filter Summary!**", None
+        file = record.toFile('filter_summary.txt')
+
+        await self.bot.services.log_buffer.send(channel, content=content, embed=embed, file=file)
+
+
+async def setup(bot):
+    await bot.add_cog(ModerationQueueCog(bot))
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import traceback
+from typing import Any
+
+import discord
+from discord.ext import commands, tasks
+
+log = logging.getLogger(__name__)
+
+BURST_SIZE = 5  # members given the same role change within one flush are logged as one summary
+
+
+class RoleChangeQueueCog(commands.Cog):
+    """ Collects member role changes and flushes them every second. When a bot or moderator gives or removes a role
+    from many members at once, the audit log is read once and a single summary is sent instead of one log per member.
+    Each log is sent from its own task, so a slow audit log lookup in one guild doesn't hold up the others. """
+
+    def __init__(self, bot):
+        self.bot = bot
+
+        self._batch_lock = asyncio.Lock()
+        # guild id to (ids of the roles gained, ids of the roles lost) to member id to the member after the change
+        self._changes: dict[int, dict[tuple[frozenset[int], frozenset[int]], dict[int, discord.Member]]] = {}
+        self._tasks: set[asyncio.Task] = set()  # logs still being sent
+
+        self.flush_loop.start()
+
+    async def cog_load(self) -> None:
+        self.bot.services.role_changes = self
+
+    async def cog_unload(self) -> None:
+        self.bot.services.role_changes = None
+        self.flush_loop.stop()
+        async with self._batch_lock:
+            await self.flush()  # don't lose role changes on reload
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+
+    def queue(self, member: discord.Member, gained_ids: frozenset[int], lost_ids: frozenset[int]):
+        self._changes.setdefault(member.guild.id, {}).setdefault((gained_ids, lost_ids), {})[member.id] = member
+
+    def queueSize(self) -> int:
+        """ The number of member role changes waiting to be logged """
+        return sum(len(members) for changes in self._changes.values() for members in changes.values())
+
+    @tasks.loop(seconds=1)
+    async def flush_loop(self):
+        async with self._batch_lock:
+            await self.flush()
+
+    @flush_loop.error
+    async def on_flush_loop_error(self, *args: Any) -> None:
+        exception: Exception = args[-1]
+        log.error('Unhandled exception in internal background task flush_loop')
+        traceback.print_exception(type(exception), exception, exception.__traceback__)
+
+        await asyncio.sleep(5)
+        log.info("Restarting task...")
+
+        self.flush_loop.restart()
+
+    async def flush(self):
+        changes, self._changes = self._changes, {}
+
+        auditLogCog = self.bot.services.audit_logs
+        for guild_changes in changes.values():
+            for (gained_ids, lost_ids), members in guild_changes.items():
+                if len(members) >= BURST_SIZE:
+                    self.startLog(auditLogCog.handleRoleUpdateBurst(list(members.values()), gained_ids, lost_ids))
+                else:
+                    for member in members.values():
+                        self.startLog(auditLogCog.handleRoleUpdate(member, gained_ids, lost_ids))
+
+    def startLog(self, coro):
+        task = asyncio.create_task(self.sendLog(coro))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def sendLog(coro):
+        try:
+            await coro
+        except discord.HTTPException as e:  # missing audit log permission
+            log.warning(f'Failed to log role update: {e}')
+        except Exception:
+            log.exception('Failed to log role update')
+
+
+async def setup(bot):
+    await bot.add_cog(RoleChangeQueueCog(bot))
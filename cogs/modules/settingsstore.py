@@ -0,0 +1,317 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import traceback
+import uuid
+from typing import Any, Iterable, Optional
+
+import asyncpg
+from discord.ext import commands, tasks
+
+from cogs.commands.settings import DEFAULT_SETTINGS, GUILD_COLUMNS, GuildSettings
+from constants import DEV_PLATFORM, DEV_POSTGRE_URL, POSTGRE_URL
+
+log = logging.getLogger(__name__)
+
+JOURNAL_FILE = 'settings_journal.jsonl'  # changes not yet saved to postgreSQL, replayed if the bot stops before a flush
+HYDRATE_DELAY = 0.1  # seconds guilds are collected for before their settings are loaded in one query
+NOTIFY_CHANNEL = 'guild_settings'  # every bot process is told about settings saved by the others on this channel
+PROCESS_ID = uuid.uuid4().hex  # so a process can ignore its own notifications
+MAX_PAYLOAD_SIZE = 7900  # bytes, notification payloads must be shorter than 8000
+MAX_SAVE_ATTEMPTS = 3  # a guild's changes are set aside after failing to save this many times in a row
+# errors which mean postgreSQL couldn't be reached, so the whole batch is retried later
+CONNECTION_ERRORS = (OSError, asyncio.TimeoutError, asyncpg.PostgresConnectionError, asyncpg.InterfaceError)
+
+
+class SettingsStoreCog(commands.Cog):
+    """ Saves settings changes. A change is applied in memory straight away and written to a journal file, then changes
+    are flushed to postgreSQL every few seconds. Changes to the same guild are merged, so each guild gets one upsert
+    per flush however many settings were changed. The journal is only cleared once a flush has been committed.
+    Each flush notifies the other bot processes, which reload the changed guilds' settings. """
+
+    def __init__(self, bot):
+        self.bot = bot
+
+        self._batch_lock = asyncio.Lock()
+        self._pending: dict[int, dict[str, Any]] = {}  # guild id to the columns to save and their new values
+        self._failures: dict[int, int] = {}  # guild id to how many times in a row its changes failed to save
+        self._parked: dict[int, dict[str, Any]] = {}  # changes which kept failing, kept in the journal for the next start
+        self._hydrate_ids: set[int] = set()  # guilds waiting to have their settings loaded
+        self._hydrate_task: Optional[asyncio.Task] = None
+        self._listener: Optional[asyncpg.Connection] = None  # its own connection, as pool connections are handed around
+
+        self.replayJournal()
+
+        self.flush_loop.add_exception_type(asyncpg.PostgresConnectionError)
+        self.flush_loop.start()
+
+    async def cog_load(self) -> None:
+        self.bot.services.settings_store = self
+        self.listen_loop.start()
+
+    async def cog_unload(self) -> None:
+        self.bot.services.settings_store = None
+        self.flush_loop.stop()
+        self.listen_loop.cancel()
+        try:
+            await self.flushNow()
+        finally:
+            # closed even if the flush failed, or this instance would keep handling notifications after a reload
+            if self._listener is not None:
+                await self._listener.close()
+
+    @tasks.loop(seconds=30.0)
+    async def listen_loop(self):
+        """ Listens for settings saved by other processes, and reconnects if the listener connection was lost """
+        if self._listener is not None and not self._listener.is_closed():
+            return
+
+        reconnecting = self._listener is not None
+        url = DEV_POSTGRE_URL if sys.platform == DEV_PLATFORM else POSTGRE_URL
+        try:
+            self._listener = await asyncpg.connect(url)
+            await self._listener.add_listener(NOTIFY_CHANNEL, self.on_settings_notify)
+        except (OSError, asyncpg.PostgresError) as e:
+            log.warning(f'Could not listen for settings changes, retrying in 30 seconds: {e}')
+            return
+
+        if reconnecting:
+            # notifications sent while disconnected are lost, so pick up what changed from updated_at
+            ownerCog = self.bot.get_cog('OwnerCog')
+            if ownerCog:
+                await ownerCog.load_guilds(full=False)
+
+    @listen_loop.error
+    async def on_listen_loop_error(self, *args: Any) -> None:
+        exception: Exception = args[-1]
+        log.error('Unhandled exception in internal background task listen_loop')
+        traceback.print_exception(type(exception), exception, exception.__traceback__)
+
+        await asyncio.sleep(5)
+        log.info("Restarting task...")
+
+        self.listen_loop.restart()
+
+    def on_settings_notify(self, connection: asyncpg.Connection, pid: int, channel: str, payload: str):
+        notification = json.loads(payload)
+        if notification['origin'] == PROCESS_ID:
+            return  # already in memory
+        for guild_id, columns in notification['guilds'].items():
+            log.debug(f'Guild {guild_id} changed {", ".join(columns)} in another process')
+            self.queueHydrate(int(guild_id))  # json object keys are strings
+
+    def save(self, guild_id: int, **changes):
+        """ Changes some of a guild's settings. Setting one to None resets it to the default """
+        for column in changes:
+            if column not in GuildSettings.DEFAULTS:
+                raise ValueError(f'Unknown setting {column}')
+
+        # the journal is written first, so a change the bot has acted on is never lost
+        self.writeJournal(guild_id, changes)
+        self._pending.setdefault(guild_id, {}).update(changes)
+        self.bot.services.settings.updateSettings(guild_id, **changes)
+
+    def writeJournal(self, guild_id: int, changes: dict[str, Any]):
+        with open(JOURNAL_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'guild_id': guild_id, 'changes': changes}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def replayJournal(self):
+        """ Queues the changes left in the journal by the last run """
+        try:
+            with open(JOURNAL_FILE, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+
+        for line in lines:
+            try:
+                change = json.loads(line)
+            except json.JSONDecodeError:
+                break  # the bot stopped part way through writing this line, so it was never acted on
+            self._pending.setdefault(change['guild_id'], {}).update(change['changes'])
+
+        if self._pending:
+            log.info(f'Replaying {len(self._pending)} unsaved guild settings changes')
+
+    def rewriteJournal(self):
+        """ Replaces the journal with the changes still waiting to be saved """
+        temp_file = JOURNAL_FILE + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            # parked changes first, so newer pending changes to the same settings win when replayed
+            for changes_by_guild in (self._parked, self._pending):
+                for guild_id, changes in changes_by_guild.items():
+                    f.write(json.dumps({'guild_id': guild_id, 'changes': changes}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, JOURNAL_FILE)
+
+    def queueHydrate(self, guild_id: int):
+        """ Loads a guild's settings from postgreSQL soon, together with any other guilds queued at the same time """
+        self._hydrate_ids.add(guild_id)
+        if self._hydrate_task is None:
+            self._hydrate_task = asyncio.create_task(self.hydrateQueued())
+
+    async def hydrateQueued(self):
+        await asyncio.sleep(HYDRATE_DELAY)
+        guild_ids, self._hydrate_ids = self._hydrate_ids, set()
+        self._hydrate_task = None
+
+        try:
+            await self.hydrate(guild_ids)
+        except Exception as e:
+            log.warning(f'Failed to load settings for {len(guild_ids)} guilds: {e}')
+
+    async def hydrate(self, guild_ids: Iterable[int]):
+        """ Loads some guilds' settings from postgreSQL with one query. Guilds without a row get the defaults """
+        guild_ids = list(guild_ids)
+        query = f"SELECT {GUILD_COLUMNS} FROM guilds WHERE guild_id = ANY($1::bigint[]);"
+        records = await self.bot.pool.fetch(query, guild_ids)
+
+        found = {guild["guild_id"]: GuildSettings.fromRecord(guild) for guild in records}
+        settingsCog = self.bot.services.settings
+        for guild_id in guild_ids:
+            settingsCog.setSettings(guild_id, self.withUnsaved(guild_id, found.get(guild_id, DEFAULT_SETTINGS)))
+
+    def withUnsaved(self, guild_id: int, settings: GuildSettings) -> GuildSettings:
+        """ Applies a guild's changes which aren't saved yet on top of settings read from postgreSQL,
+        so loading a row older than memory never rolls them back """
+        unsaved = {**self._parked.get(guild_id, {}), **self._pending.get(guild_id, {})}
+        return settings.replace(**unsaved) if unsaved else settings
+
+    def overlayUnsaved(self, guild_settings: dict[int, GuildSettings]):
+        """ Applies every unsaved change to a freshly loaded dict of guild settings """
+        for guild_id in self._parked.keys() | self._pending.keys():
+            settings = self.withUnsaved(guild_id, guild_settings.get(guild_id, DEFAULT_SETTINGS))
+            if settings.isDefault():
+                guild_settings.pop(guild_id, None)
+            else:
+                guild_settings[guild_id] = settings
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        self.queueHydrate(guild.id)  # a guild which added the bot back may still have its old settings
+
+    @tasks.loop(seconds=5.0)
+    async def flush_loop(self):
+        await self.flushNow()
+
+    @flush_loop.error
+    async def on_flush_loop_error(self, *args: Any) -> None:
+        exception: Exception = args[-1]
+        log.error('Unhandled exception in internal background task flush_loop')
+        traceback.print_exception(type(exception), exception, exception.__traceback__)
+
+        await asyncio.sleep(5)
+        log.info("Restarting task...")
+
+        self.flush_loop.restart()
+
+    async def flushNow(self):
+        async with self._batch_lock:
+            await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+
+        try:
+            await self.upsert(batch)
+        except CONNECTION_ERRORS:
+            self.requeue(batch)
+            raise
+        except Exception as e:
+            if len(batch) == 1:
+                self.saveFailed(*batch.items(), e)
+            else:
+                # one guild's bad row fails the whole transaction, so save them one at a time to find it
+                log.warning(f'Failed to save settings for {len(batch)} guilds, saving them one by one: {e}')
+                await self.flushEach(batch)
+        else:
+            for guild_id in batch:
+                self._failures.pop(guild_id, None)
+
+        self.rewriteJournal()
+
+        if len(batch) > 1:
+            log.info('Saved settings for %s guilds to the database.', len(batch))
+
+    async def flushEach(self, batch: dict[int, dict[str, Any]]):
+        guild_ids = list(batch)
+        for i, guild_id in enumerate(guild_ids):
+            changes = batch[guild_id]
+            try:
+                await self.upsert({guild_id: changes})
+            except CONNECTION_ERRORS:
+                self.requeue({guild_id: batch[guild_id] for guild_id in guild_ids[i:]})
+                raise
+            except Exception as e:
+                self.saveFailed((guild_id, changes), e)
+            else:
+                self._failures.pop(guild_id, None)
+
+    def saveFailed(self, item: tuple[int, dict[str, Any]], error: Exception):
+        """ Retries a guild's changes on the next flush, or sets them aside if they keep failing """
+        guild_id, changes = item
+        failures = self._failures[guild_id] = self._failures.get(guild_id, 0) + 1
+        if failures < MAX_SAVE_ATTEMPTS:
+            log.warning(f'Failed to save settings for guild {guild_id}, attempt {failures}: {error}')
+            self.requeue({guild_id: changes})
+        else:
+            log.error(f'Giving up saving settings {", ".join(sorted(changes))} for guild {guild_id}: {error}')
+            del self._failures[guild_id]
+            self._parked[guild_id] = {**self._parked.get(guild_id, {}), **changes}
+
+    def requeue(self, batch: dict[int, dict[str, Any]]):
+        """ Puts changes back under anything changed since, so the next flush retries them """
+        for guild_id, changes in batch.items():
+            self._pending[guild_id] = {**changes, **self._pending.get(guild_id, {})}
+
+    async def upsert(self, batch: dict[int, dict[str, Any]]):
+        """ Saves some guilds' changes in one transaction and notifies the other bot processes """
+        # guilds which changed the same settings share one statement
+        statements: dict[tuple[str, ...], list[tuple]] = {}
+        for guild_id, changes in batch.items():
+            columns = tuple(sorted(changes))
+            statements.setdefault(columns, []).append((guild_id, *(changes[column] for column in columns)))
+
+        async with self.bot.pool.acquire() as conn:
+            async with conn.transaction():
+                for columns, rows in statements.items():
+                    values = ', '.join(f'${i}' for i in range(2, len(columns) + 2))
+                    updates = ', '.join(f'{column} = EXCLUDED.{column}' for column in columns) + ', updated_at = now()'
+                    query = f"INSERT INTO guilds (guild_id, {', '.join(columns)}) VALUES ($1, {values}) " \
+                            f"ON CONFLICT (guild_id) DO UPDATE SET {updates};"
+                    await conn.executemany(query, rows)
+
+                # sent when the transaction commits
+                for payload in self.notifyPayloads(batch):
+                    await conn.execute("SELECT pg_notify($1, $2);", NOTIFY_CHANNEL, payload)
+
+    @staticmethod
+    def notifyPayloads(batch: dict[int, dict[str, Any]]) -> list[str]:
+        """ Splits the changed guilds across as few notifications as fit under the payload size limit """
+        payloads = []
+        guilds: dict[str, list[str]] = {}
+        size = len(json.dumps({'origin': PROCESS_ID, 'guilds': {}}))
+        for guild_id, changes in batch.items():
+            columns = sorted(changes)
+            guild_size = len(json.dumps({str(guild_id): columns}))  # its braces stand in for the separating ", "
+            if guilds and size + guild_size > MAX_PAYLOAD_SIZE:
+                payloads.append(json.dumps({'origin': PROCESS_ID, 'guilds': guilds}))
+                guilds = {}
+                size = len(json.dumps({'origin': PROCESS_ID, 'guilds': {}}))
+            guilds[str(guild_id)] = columns
+            size += guild_size
+        if guilds:
+            payloads.append(json.dumps({'origin': PROCESS_ID, 'guilds': guilds}))
+        return payloads
+
+
+async def setup(bot):
+    await bot.add_cog(SettingsStoreCog(bot))
@@ -23,16 +23,20 @@ import psutil
 import pygit2
 from discord.ext import commands
 
+from cogs.commands.settings import CONFIGURED_GUILDS, GUILD_COLUMNS, GuildSettings
 from constants import *
 
 log = logging.getLogger(__name__)
 
+UPDATED_AT_MARGIN = datetime.timedelta(minutes=1)
+
 
 class OwnerCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self._last_result = None
         self.lock = asyncio.Lock()
+        self.settings_loaded_until: typing.Optional[datetime.datetime] = None  # the newest updated_at loaded from the guilds table
 
     async def cog_check(self, ctx) -> bool:
         return await self.bot.is_owner(ctx.author)
@@ -67,6 +71,11 @@ class OwnerCog(commands.Cog):
         try:
             self.bot.pool = await asyncpg.create_pool(url, init=init, **kwargs)
             log.info("Connected to PostgreSQL")
+
+            # columns added after the guilds table was made
+            await self.bot.pool.execute("ALTER TABLE guilds ADD COLUMN IF NOT EXISTS log_batch_delay INTEGER;")
+            # the column changed guilds are found by
+            await self.bot.pool.execute("ALTER TABLE guilds ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now();")
         except Exception as e:
             log.exception('Could not set up PostgreSQL. Exiting.', e)
 
@@ -261,9 +270,9 @@ class OwnerCog(commands.Cog):
                 await ctx.message.reply("Data saved")
 
     @commands.is_owner()
-    @commands.command(aliases=["loadmemory"], description="Reloads the data in memory by reading from disk and postgreSQL")
-    async def refreshmemory(self, ctx):
-        """ Reload data from disk"""
+    @commands.command(aliases=["loadmemory"], usage="[full]", description="Reloads the data in memory by reading from disk and postgreSQL")
+    async def refreshmemory(self, ctx, scope: typing.Optional[typing.Literal["full"]] = None):
+        """ Reload data from disk. Only guilds whose settings changed are reloaded unless full is given """
 
         def _load():
             with open('stats.json', 'r', encoding='utf-8') as f:
@@ -280,7 +289,7 @@ class OwnerCog(commands.Cog):
             #     self.bot.vote_data = data  # load vote data
             #     f.close()
 
-        await self.load_guilds()
+        await self.load_guilds(full=scope == "full")
 
         async with self.lock:
             await self.bot.loop.run_in_executor(None, _load)
@@ -288,29 +297,61 @@ class OwnerCog(commands.Cog):
             if ctx is not None:
                 await ctx.message.reply("Data reloaded")
 
-    async def load_guilds(self):
-        """ Loads all guild data into memory from postgreSQL"""
-        query = "SELECT * FROM guilds;"
+    async def load_guilds(self, full: bool = True):
+        """ Loads guild data into memory from postgreSQL. After the first load only guilds changed since the last load
+        are read, unless full is True """
+        settingsStore = self.bot.services.settings_store
+        if settingsStore:
+            await settingsStore.flushNow()  # unsaved changes would be overwritten by the old rows
 
-        # async with self.bot.pool.acquire() as conn:
-        #     async with conn.transaction():
+        if full or self.settings_loaded_until is None:
+            await self.load_all_guilds()
+        else:
+            await self.load_changed_guilds()
 
-        guild_data = await self.bot.pool.fetch(query)
+    async def load_all_guilds(self):
+        # guilds which haven't changed any settings aren't read at all
+        query = f"SELECT {GUILD_COLUMNS} FROM guilds WHERE {CONFIGURED_GUILDS};"
 
         guild_settings = {}
-
-        for guild in guild_data:
-            guild_id = guild["guild_id"]
-            guild_settings[str(guild_id)] = {}
-
-            for column, value in guild.items():
-                if column == "id" or column == "guild_id":
-                    continue
-                elif value is not None:
-                    guild_settings[str(guild_id)][column] = value
-
-        self.bot.guild_settings = guild_settings
-        # log.info(guild_settings)
+        # taken before the read and over every row, so guilds reset to the defaults are seen by the next reload
+        loaded_until = await self.bot.pool.fetchval("SELECT max(updated_at) FROM guilds;")
+        async with self.bot.pool.acquire() as conn:
+            async with conn.transaction():  # cursors only work in a transaction
+                # rows are turned into settings as they arrive instead of all being held at once
+                async for guild in conn.cursor(query, prefetch=1000):
+                    settings = GuildSettings.fromRecord(guild)
+                    if not settings.isDefault():
+                        guild_settings[guild["guild_id"]] = settings
+
+        settingsStore = self.bot.services.settings_store
+        if settingsStore:
+            settingsStore.overlayUnsaved(guild_settings)  # saved or parked while the rows were being read
+
+        self.bot.guild_settings = guild_settings  # swap every guild's settings in at once
+        self.settings_loaded_until = loaded_until or datetime.datetime.now(datetime.timezone.utc)
+
+        settingsCog = self.bot.get_cog("SettingsCommand")
+        if settingsCog:
+            settingsCog.clearCaches()  # compiled filters may be stale
+
+    async def load_changed_guilds(self):
+        query = f"SELECT {GUILD_COLUMNS} FROM guilds WHERE updated_at > $1;"
+
+        # a write which started before the last load but committed after it has an older updated_at, so look back a little
+        records = await self.bot.pool.fetch(query, self.settings_loaded_until - UPDATED_AT_MARGIN)
+
+        settingsCog = self.bot.services.settings
+        settingsStore = self.bot.services.settings_store
+        for guild in records:
+            settings = GuildSettings.fromRecord(guild)
+            if settingsStore:
+                settings = settingsStore.withUnsaved(guild["guild_id"], settings)
+            settingsCog.setSettings(guild["guild_id"], settings)
+            if guild["updated_at"] > self.settings_loaded_until:
+                self.settings_loaded_until = guild["updated_at"]
+
+        log.info(f'Reloaded settings for {len(records)} changed guilds')
 
     # @commands.is_owner()
     # @commands.command(description="Shows 1000 most recent votes for the bot")
@@ -587,7 +628,14 @@ class OwnerCog(commands.Cog):
         description.append(f'User cache size: {len(self.bot.users)}')
         description.append(f'Message cache size: {len(self.bot.cached_messages)}')
         description.append(f'Msg delete cache size: {len(self.bot.delete_log_cache)}')
-        description.append(f'Role delete cache size: {len(self.bot.delete_role_cache)}')
+        services = self.bot.services
+        if services.mod_queue:
+            deletes, timeouts, logs = services.mod_queue.queueSizes()
+            description.append(f'Moderation queue: {deletes} deletes, {timeouts} timeouts, {logs} logs')
+        else:
+            description.append('Moderation queue: not loaded')
+        description.append(f"Role changes waiting: {services.role_changes.queueSize() if services.role_changes else 'not loaded'}")
+        description.append(f"Events skipped by router: {services.event_router.dropped if services.event_router else 'not loaded'}")
 
         description.append(f"updater Task running: {self.bot.get_cog('TaskCog').updater.is_running()}")
         description.append(f"vote_reminder Task running: {self.bot.get_cog('TaskCog').vote_reminder.is_running()}")